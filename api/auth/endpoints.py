@@ -1,31 +1,42 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import create_access_token, decode_token, jwt_required, get_jwt_identity
 from flask_bcrypt import Bcrypt
+from mysql.connector import errorcode
+from mysql.connector.errors import IntegrityError
 import logging
 
-from helper.db_helper import get_connection
+from helper.db_helper import get_cursor, release_db, transactional
+from helper.query_registry import register_query
+from helper.response_format import columnar_response, requested_format
 
 # Setup untuk bcrypt dan Blueprint
 bcrypt = Bcrypt()
 auth_endpoints = Blueprint('auth', __name__)
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
+# Setup logging, handlers dikonfigurasi sekali di app.py
 logger = logging.getLogger(__name__)
 
+READ_USERS_QUERY = register_query(
+    "auth.read", "SELECT * FROM users", allow_full_scan=("users",))
+LOGIN_QUERY = register_query(
+    "auth.login", "SELECT * FROM users WHERE username = %s AND deleted_at IS NULL", ("admin",))
+CHECK_USER_QUERY = register_query(
+    "auth.reset_password.check", "SELECT * FROM users WHERE username = %s", ("admin",))
+UPDATE_PASSWORD_QUERY = register_query(
+    "auth.reset_password.update", "UPDATE users SET password = %s WHERE username = %s",
+    ("hash", "admin"))
+
 # Route untuk membaca data user
 @auth_endpoints.route('/read', methods=['GET'])
 def read():
     """Routes for module get list auth"""
-    connection = get_connection()
-    try:
-        cursor = connection.cursor(dictionary=True)
-        select_query = "SELECT * FROM users"
-        cursor.execute(select_query)
-        results = cursor.fetchall()
-    finally:
-        cursor.close()
-        connection.close()
+    fmt = requested_format()
+    # Format columnar dibangun langsung dari tuple cursor, tanpa dict per baris
+    cursor = get_cursor(dictionary=fmt is None)
+    cursor.execute(READ_USERS_QUERY)
+    results = cursor.fetchall()
+    if fmt:
+        return columnar_response(fmt, cursor.column_names, results, message="OK")
     return jsonify({"message": "OK", "datas": results}), 200
 
 
@@ -39,15 +50,11 @@ def login():
     if not username or not password:
         return jsonify({"msg": "Username and password are required"}), 400
 
-    connection = get_connection()
-    try:
-        cursor = connection.cursor(dictionary=True)
-        query = "SELECT * FROM users WHERE username = %s AND deleted_at IS NULL"
-        cursor.execute(query, (username,))
-        user = cursor.fetchone()
-    finally:
-        cursor.close()
-        connection.close()
+    cursor = get_cursor(dictionary=True)
+    cursor.execute(LOGIN_QUERY, (username,))
+    user = cursor.fetchone()
+    # Kembalikan koneksi ke pool sebelum bcrypt yang lambat
+    release_db()
 
     if not user:
         return jsonify({"msg": "User not found"}), 404
@@ -58,7 +65,7 @@ def login():
     # Ambil role dan id_users dari database
     role = user.get('role')
     id_users = user.get('id_users')  # Ambil id_users dari hasil query
-    print(f"Role: {role}, ID Users: {id_users}")
+    logger.debug("Role: %s, ID Users: %s", role, id_users)
 
     # Buat access token
     access_token = create_access_token(
@@ -78,24 +85,27 @@ def login():
 
 # Route untuk registrasi user baru
 @auth_endpoints.route('/register', methods=['POST'])
+@transactional
 def register():
     """Routes for register"""
     username = request.form['username']
     password = request.form['password']
     role = request.form['role']
+    # Hash sebelum akses database, koneksi baru diambil saat get_cursor
     hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
 
-    connection = get_connection()
+    cursor = get_cursor()
+    insert_query = "INSERT INTO users (username, password, role) values (%s, %s, %s)"
+    request_insert = (username, hashed_password, role)
     try:
-        cursor = connection.cursor()
-        insert_query = "INSERT INTO users (username, password, role) values (%s, %s, %s)"
-        request_insert = (username, hashed_password, role)
         cursor.execute(insert_query, request_insert)
-        connection.commit()
-        new_id = cursor.lastrowid
-    finally:
-        cursor.close()
-        connection.close()
+    except IntegrityError as e:
+        # uq_users_username dari migration 0002
+        if e.errno != errorcode.ER_DUP_ENTRY:
+            raise
+        return jsonify({"message": "Failed",
+                        "description": "Username already exists"}), 409
+    new_id = cursor.lastrowid
 
     if new_id:
         return jsonify({"message": "OK",
@@ -106,32 +116,24 @@ def register():
 
 # Route untuk reset password
 @auth_endpoints.route('/reset-password', methods=['POST'])
+@transactional
 def reset_password():
     """Routes for resetting password"""
     # Ambil data dari request
     username = request.form['username']
     new_password = request.form['new_password']
 
-    # Hash password baru
+    # Hash password baru sebelum akses database
     hashed_password = bcrypt.generate_password_hash(new_password).decode('utf-8')
 
     # Cek apakah username ada dalam database
-    connection = get_connection()
-    try:
-        cursor = connection.cursor()
-        check_user_query = "SELECT * FROM users WHERE username = %s"
-        cursor.execute(check_user_query, (username,))
-        user = cursor.fetchone()
-
-        if user:
-            update_query = "UPDATE users SET password = %s WHERE username = %s"
-            cursor.execute(update_query, (hashed_password, username))
-            connection.commit()
-        else:
-            return jsonify({"message": "Failed", "description": "User not found"}), 404
-    finally:
-        cursor.close()
-        connection.close()
+    cursor = get_cursor()
+    cursor.execute(CHECK_USER_QUERY, (username,))
+    user = cursor.fetchone()
+
+    if not user:
+        return jsonify({"message": "Failed", "description": "User not found"}), 404
+    cursor.execute(UPDATE_PASSWORD_QUERY, (hashed_password, username))
 
     return jsonify({"message": "OK", "description": "Password updated successfully"}), 200
 
@@ -144,7 +146,7 @@ def logout():
     current_user = get_jwt_identity()
 
     # Log aktivitas logout
-    logger.info(f"User {current_user['username']} logged out")
+    logger.info("User %s logged out", current_user['username'])
 
     # Biasanya untuk logout, cukup beri tahu client untuk menghapus tokennya.
     # Jika Anda ingin mengimplementasikan blacklist, Anda bisa menyimpan token yang dicabut.
@@ -2,19 +2,165 @@ from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from flask_bcrypt import Bcrypt
 import logging
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 
-from helper.db_helper import get_connection
+from extensions import booking_scheduler, cache, idempotency, job_queue
+from helper.admission import DeadlineExceeded
+from helper.audit import audit_log
+from helper.booking_scheduler import compute_status
+from helper.calendar_cache import build_grid, calendar_key, parse_slot, to_minutes, week_start
+from helper.db_helper import after_commit, get_cursor, transactional
+from helper.query_registry import register_query
+from helper.response_format import columnar_response, requested_format
 
 # Setup bcrypt and Blueprint
 bcrypt = Bcrypt()
 booking_endpoints = Blueprint('booking', __name__)
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
+# Setup logging, handlers are configured once in app.py
 logger = logging.getLogger(__name__)
 
+READ_BY_USER_QUERY = register_query("booking.read", """
+    SELECT
+        booking.*,
+        list_field.field_name
+    FROM booking
+    LEFT JOIN list_field ON booking.id_field = list_field.id_field
+    WHERE booking.id_users = %s AND booking.deleted_at IS NULL
+""", (1,))
+READ_ARCHIVED_BY_USER_QUERY = register_query("booking.read.archived", """
+    SELECT
+        booking_archive.*,
+        list_field.field_name
+    FROM booking_archive
+    LEFT JOIN list_field ON booking_archive.id_field = list_field.id_field
+    WHERE booking_archive.id_users = %s AND booking_archive.deleted_at IS NULL
+""", (1,))
+READ_BY_OWNER_QUERY = register_query("booking.read_by_owner", """
+SELECT
+    b.id_booking,
+    b.booking_date,
+    b.start_time,
+    b.end_time,
+    b.total_price,
+    b.status,
+    lf.field_name
+FROM
+    booking b
+JOIN
+    list_field lf ON b.id_field = lf.id_field
+WHERE
+    lf.id_users = %s AND b.deleted_at IS NULL
+ORDER BY
+    b.booking_date DESC, b.start_time ASC
+""", (1,))
+# Same columns, hot table plus archive, for ?include_archived=1. The sort runs
+# over the merged rows, which EXPLAIN reports as a scan of <union1,2>.
+READ_BY_OWNER_WITH_ARCHIVE_QUERY = register_query("booking.read_by_owner.archived", """
+SELECT b.id_booking, b.booking_date, b.start_time, b.end_time, b.total_price, b.status,
+       lf.field_name
+FROM booking b
+JOIN list_field lf ON b.id_field = lf.id_field
+WHERE lf.id_users = %s AND b.deleted_at IS NULL
+UNION ALL
+SELECT ba.id_booking, ba.booking_date, ba.start_time, ba.end_time, ba.total_price, ba.status,
+       lf.field_name
+FROM booking_archive ba
+JOIN list_field lf ON ba.id_field = lf.id_field
+WHERE lf.id_users = %s AND ba.deleted_at IS NULL
+ORDER BY booking_date DESC, start_time ASC
+""", (1, 1), allow_full_scan=("<union1,2>",))
+FIELD_PRICE_QUERY = register_query("booking.create.field", """
+SELECT
+    lf.price,
+    u.id_users AS id_owner
+FROM
+    list_field lf
+JOIN
+    users u ON lf.id_users = u.id_users
+WHERE
+    lf.id_field = %s AND lf.deleted_at IS NULL AND u.role = 'OWNER'
+""", (1,))
+CHECK_BOOKING_QUERY = register_query(
+    "booking.check", "SELECT * FROM booking WHERE id_booking = %s AND deleted_at IS NULL", (1,))
+UPDATE_BOOKING_QUERY = register_query("booking.update", """
+UPDATE booking
+SET booking_date=%s, start_time=%s, end_time=%s, status=%s, total_price=%s
+WHERE id_booking=%s
+""", ("2024-01-01", "08:00:00", "09:00:00", "UPCOMING", 0, 1))
+DELETE_BOOKING_QUERY = register_query(
+    "booking.delete", "UPDATE booking SET deleted_at = NOW() WHERE id_booking = %s", (1,))
+CALENDAR_QUERY = register_query("booking.calendar", """
+SELECT booking_date, start_time, end_time
+FROM booking
+WHERE id_field = %s AND booking_date BETWEEN %s AND %s AND deleted_at IS NULL
+""", (1, "2024-01-01", "2024-01-07"))
+
+# Longest range a single calendar request may cover
+CALENDAR_MAX_DAYS = 62
+
+
+@cache.memoize("field_price:{id_field}", tags=("field:{id_field}",))
+def load_field_price(id_field):
+    """Price per hour and owner of a field, None if it does not exist"""
+    cursor = get_cursor(dictionary=True)
+    cursor.execute(FIELD_PRICE_QUERY, (id_field,))
+    return cursor.fetchone()
+
+
+def include_archived():
+    """True when the client asked for archived bookings with ?include_archived=1"""
+    return request.args.get('include_archived') == '1'
+
+
+def _parse_booking_date(value):
+    """`date` of a YYYY-MM-DD booking_date, None if it is not a valid date"""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+
+
+def _transition_times(booking_date, start_time, end_time):
+    """Start and end datetime of a booking, for booking_scheduler.schedule"""
+    return (datetime.strptime(f"{booking_date} {start_time}", "%Y-%m-%d %H:%M:%S"),
+            datetime.strptime(f"{booking_date} {end_time}", "%Y-%m-%d %H:%M:%S"))
+
+
+def _format_owner_date(value):
+    """Format booking_date for read_by_owner"""
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return value
+
+
+def _format_owner_time(value):
+    """Format start_time/end_time for read_by_owner as HH:MM:SS"""
+    if isinstance(value, datetime):
+        return value.strftime('%H:%M:%S')
+    # If the time fields are timedelta, convert to hours and format as HH:MM:SS
+    if isinstance(value, timedelta):
+        hours = value.seconds // 3600
+        minutes = (value.seconds // 60) % 60
+        return f"{hours:02}:{minutes:02}:00"
+    return value
+
+
+def _format_owner_price(value):
+    """Format total_price with 3 decimal places"""
+    if isinstance(value, Decimal):
+        return f"{value:.3f}"
+    return value
+
+
+OWNER_CONVERTERS = {
+    'booking_date': _format_owner_date,
+    'start_time': _format_owner_time,
+    'end_time': _format_owner_time,
+    'total_price': _format_owner_price,
+}
+
 @booking_endpoints.route('/read', methods=['GET'])
 @jwt_required()
 def read():
@@ -27,21 +173,16 @@ def read():
 
     id_users = identity.get('id_users')
 
-    connection = get_connection()
     try:
-        cursor = connection.cursor(dictionary=True)
-        
+        cursor = get_cursor(dictionary=True)
+
         # Query untuk mengambil data booking berdasarkan id_users
-        query = """
-            SELECT 
-                booking.*, 
-                list_field.field_name 
-            FROM booking
-            LEFT JOIN list_field ON booking.id_field = list_field.id_field
-            WHERE booking.id_users = %s
-        """
-        cursor.execute(query, (id_users,))
+        cursor.execute(READ_BY_USER_QUERY, (id_users,))
         results = cursor.fetchall()
+        # Booking lama hanya dibaca dari arsip jika diminta
+        if include_archived():
+            cursor.execute(READ_ARCHIVED_BY_USER_QUERY, (id_users,))
+            results.extend(cursor.fetchall())
         
         # Format data
         for result in results:
@@ -62,25 +203,23 @@ def read():
 
         # Log jika data ditemukan atau tidak
         if not results:
-            logger.info(f"No bookings found for user with id_users={id_users}.")
+            logger.info("No bookings found for user with id_users=%s.", id_users)
             return jsonify({"message": "No bookings found."}), 404
         
-        logger.info(f"Fetched bookings for user with id_users={id_users}.")
+        logger.info("Fetched bookings for user with id_users=%s.", id_users)
         return jsonify(results), 200
 
+    except DeadlineExceeded:
+        # Biarkan error handler admission membalas 503 + Retry-After
+        raise
     except Exception as e:
-        logger.error(f"Error fetching bookings: {str(e)}")
+        logger.error("Error fetching bookings: %s", e)
         return jsonify({"message": "Error fetching bookings", "error": str(e)}), 500
-    finally:
-        cursor.close()
-        connection.close()
 
         
 @booking_endpoints.route('/read_by_owner', methods=['GET'])
 @jwt_required()
 def get_bookings_by_owner():
-    connection = None
-    cursor = None
     try:
         # Ambil id_users dan role dari JWT
         identity = get_jwt_identity()
@@ -93,82 +232,113 @@ def get_bookings_by_owner():
 
         if role != "Owner":
             return jsonify({"message": "Access denied. Only owners can view this data."}), 403
+        fmt = requested_format()
 
-        # Buka koneksi ke database
-        connection = get_connection()
-        cursor = connection.cursor(dictionary=True)
+        # Format columnar memakai tuple langsung
+        cursor = get_cursor(dictionary=fmt is None)
 
         # Ambil data booking berdasarkan id_field yang dimiliki owner
-        select_query = """
-        SELECT 
-            b.id_booking, 
-            b.booking_date, 
-            b.start_time, 
-            b.end_time, 
-            b.total_price, 
-            b.status, 
-            lf.field_name
-        FROM 
-            booking b
-        JOIN 
-            list_field lf ON b.id_field = lf.id_field
-        WHERE 
-            lf.id_users = %s
-        ORDER BY 
-            b.booking_date DESC, b.start_time ASC
-        """
-        cursor.execute(select_query, (id_users,))
+        if include_archived():
+            cursor.execute(READ_BY_OWNER_WITH_ARCHIVE_QUERY, (id_users, id_users))
+        else:
+            cursor.execute(READ_BY_OWNER_QUERY, (id_users,))
         bookings = cursor.fetchall()
 
         # Cek apakah ada hasil
         if not bookings:
             return jsonify({"message": "No bookings found for this owner."}), 404
 
+        if fmt:
+            return columnar_response(fmt, cursor.column_names, bookings,
+                                     converters=OWNER_CONVERTERS)
+
         # Format the results
         for booking in bookings:
-            # Format datetime fields
-            if isinstance(booking['booking_date'], datetime):
-                booking['booking_date'] = booking['booking_date'].strftime('%Y-%m-%d %H:%M:%S')
-            if isinstance(booking['start_time'], datetime):
-                booking['start_time'] = booking['start_time'].strftime('%H:%M:%S')
-            if isinstance(booking['end_time'], datetime):
-                booking['end_time'] = booking['end_time'].strftime('%H:%M:%S')
-
-            # If the time fields are timedelta, convert to hours and format as HH:MM:SS
-            if isinstance(booking['start_time'], timedelta):
-                hours = booking['start_time'].seconds // 3600
-                minutes = (booking['start_time'].seconds // 60) % 60
-                booking['start_time'] = f"{hours:02}:{minutes:02}:00"
-            if isinstance(booking['end_time'], timedelta):
-                hours = booking['end_time'].seconds // 3600
-                minutes = (booking['end_time'].seconds // 60) % 60
-                booking['end_time'] = f"{hours:02}:{minutes:02}:00"
-
-            # Format total_price with 3 decimal places
-            if isinstance(booking['total_price'], Decimal):
-                booking['total_price'] = f"{booking['total_price']:.3f}"
+            for key, convert in OWNER_CONVERTERS.items():
+                booking[key] = convert(booking[key])
 
         return jsonify(bookings), 200
 
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         return jsonify({"message": "Error fetching bookings", "error": str(e)}), 500
 
-    finally:
-        # Pastikan koneksi database ditutup
-        if cursor:
-            cursor.close()
-        if connection:
-            connection.close()
-            
+
+@booking_endpoints.route('/calendar', methods=['GET'])
+@jwt_required()
+def calendar():
+    """
+    Route to fetch the occupancy grid of a field, one bitmap string per day.
+    """
+    try:
+        id_field = int(request.args.get('id_field', ''))
+        date_from = date.fromisoformat(request.args.get('from', ''))
+        date_to = date.fromisoformat(request.args.get('to', ''))
+        slot = parse_slot(request.args.get('slot', '30m'))
+    except ValueError as e:
+        return jsonify({"message": "Invalid parameters, expected id_field, from, to (YYYY-MM-DD) "
+                                   "and slot", "error": str(e)}), 400
+    if date_to < date_from or (date_to - date_from).days >= CALENDAR_MAX_DAYS:
+        return jsonify({"message": f"from/to must span 1 to {CALENDAR_MAX_DAYS} days"}), 400
+
+    # Ambil interval per minggu dari cache, minggu yang belum ada diambil sekaligus
+    weeks = []
+    week = week_start(date_from)
+    while week <= date_to:
+        weeks.append(week)
+        week += timedelta(days=7)
+    intervals = []
+    missing = []
+    for week in weeks:
+        cached = cache.get(calendar_key(id_field, week))
+        if cached is None:
+            missing.append(week)
+        else:
+            intervals.extend(cached)
+
+    if missing:
+        # Snapshot sebelum SELECT: booking yang commit setelahnya membatalkan set di bawah
+        week_tags = {week: (f"field:{id_field}", calendar_key(id_field, week)) for week in missing}
+        versions = {week: cache.tag_versions(tags) for week, tags in week_tags.items()}
+        try:
+            cursor = get_cursor()
+            cursor.execute(CALENDAR_QUERY, (id_field, missing[0], missing[-1] + timedelta(days=6)))
+            fetched = {week: [] for week in missing}
+            for booking_date, start_time, end_time in cursor.fetchall():
+                if isinstance(booking_date, datetime):
+                    booking_date = booking_date.date()
+                week_intervals = fetched.get(week_start(booking_date))
+                if week_intervals is not None:
+                    week_intervals.append(
+                        (booking_date, to_minutes(start_time), to_minutes(end_time)))
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.error("Error fetching calendar for id_field=%s: %s", id_field, e)
+            return jsonify({"message": "Error fetching calendar", "error": str(e)}), 500
+        for week, week_intervals in fetched.items():
+            cache.set(calendar_key(id_field, week), tuple(week_intervals),
+                      tags=week_tags[week], versions=versions[week])
+            intervals.extend(week_intervals)
+
+    return jsonify({
+        "id_field": id_field,
+        "from": date_from.isoformat(),
+        "to": date_to.isoformat(),
+        "slot_minutes": slot,
+        "days": build_grid(intervals, date_from, date_to, slot),
+    }), 200
+
+
 @booking_endpoints.route('/create', methods=['POST'])
 @jwt_required()
+@idempotency.idempotent
+@transactional
 def create_booking():
     """
     Route to create a new booking using form-data.
     """
-    connection = None
-    cursor = None
-
     try:
         # Ambil identitas pengguna dari JWT
         identity = get_jwt_identity()
@@ -183,6 +353,15 @@ def create_booking():
         # Validasi input wajib
         if not id_field or not booking_date or not start_time or not end_time:
             return jsonify({"message": "Missing required fields"}), 400
+        # Normalisasi supaya key cache dan tag field:<id> sama dengan list_field
+        try:
+            id_field = int(id_field)
+        except ValueError:
+            return jsonify({"message": "id_field must be an integer"}), 400
+        # Parse sekali, dipakai untuk status, scheduler dan key cache kalender
+        booking_date = _parse_booking_date(booking_date)
+        if booking_date is None:
+            return jsonify({"message": "booking_date must be in YYYY-MM-DD format"}), 400
 
         # Hitung durasi booking dalam jam
         fmt = "%H:%M:%S"  # Format waktu
@@ -193,25 +372,10 @@ def create_booking():
         if duration <= 0:
             return jsonify({"message": "Invalid booking duration"}), 400
 
-        # Buka koneksi database
-        connection = get_connection()
-        cursor = connection.cursor(dictionary=True)
-
-        # Ambil harga per jam dan id_owner dari tabel list_field
-        select_field_query = """
-        SELECT 
-            lf.price, 
-            u.id_users AS id_owner 
-        FROM 
-            list_field lf 
-        JOIN 
-            users u ON lf.id_users = u.id_users 
-        WHERE 
-            lf.id_field = %s AND u.role = 'OWNER'
-        """
-        cursor.execute(select_field_query, (id_field,))
-        field = cursor.fetchone()
+        cursor = get_cursor(dictionary=True)
 
+        # Ambil harga per jam dan id_owner, dari cache atau tabel list_field
+        field = load_field_price(id_field)
         if not field:
             return jsonify({"message": "Field not found or no owner assigned"}), 404
 
@@ -219,9 +383,8 @@ def create_booking():
         id_owner = field["id_owner"]
         total_price = Decimal(price_per_hour) * Decimal(duration)
 
-        # Tentukan status booking
-        today_date = datetime.now().date()
-        booking_status = "UPCOMING" if datetime.strptime(booking_date, "%Y-%m-%d").date() > today_date else "ONGOING"
+        # Tentukan status booking, transisi berikutnya dijalankan oleh scheduler
+        booking_status = compute_status(booking_date, start_time, end_time)
 
         # Simpan booking ke database
         insert_booking_query = """
@@ -229,10 +392,13 @@ def create_booking():
         VALUES (%s, %s, %s, %s, %s, %s, %s)
         """
         cursor.execute(insert_booking_query, (id_field, id_users, booking_date, start_time, end_time, total_price, booking_status))
-        connection.commit()
 
         # Ambil ID booking yang baru dibuat
         new_booking_id = cursor.lastrowid
+        after_commit(booking_scheduler.schedule,
+                     *_transition_times(booking_date, start_time, end_time))
+        after_commit(cache.invalidate_tags, calendar_key(id_field, booking_date))
+        after_commit(job_queue.enqueue, audit_log, "create", "booking", new_booking_id, id_users)
 
         # Format total_price menjadi tiga digit desimal
         formatted_total_price = f"{total_price:.3f}"
@@ -246,79 +412,85 @@ def create_booking():
             "id_owner": id_owner
         }), 201
 
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         # Tangani error
         return jsonify({"message": "Error creating booking", "error": str(e)}), 500
 
-    finally:
-        # Tutup cursor dan koneksi
-        if cursor:
-            cursor.close()
-        if connection:
-            connection.close()
-
 
 @booking_endpoints.route('/update/<int:id_booking>', methods=['PUT'])
 @jwt_required()
+@transactional
 def update(id_booking):
     """
     Route to update an existing booking.
     """
     try:
         data = request.get_json()
-        connection = get_connection()
-        cursor = connection.cursor(dictionary=True)
+        booking_date = data.get('booking_date')
+        if booking_date:
+            booking_date = _parse_booking_date(booking_date)
+            if booking_date is None:
+                return jsonify({"message": "booking_date must be in YYYY-MM-DD format"}), 400
+
+        cursor = get_cursor(dictionary=True)
 
-        check_query = "SELECT * FROM booking WHERE id_booking = %s"
-        cursor.execute(check_query, (id_booking,))
+        cursor.execute(CHECK_BOOKING_QUERY, (id_booking,))
         existing_booking = cursor.fetchone()
 
         if not existing_booking:
             return jsonify({"error": "Booking not found"}), 404
 
-        update_query = """
-        UPDATE booking
-        SET booking_date=%s, start_time=%s, end_time=%s, status=%s, total_price=%s
-        WHERE id_booking=%s
-        """
-        cursor.execute(update_query, (
-            data.get('booking_date'), data.get('start_time'),
+        cursor.execute(UPDATE_BOOKING_QUERY, (
+            booking_date, data.get('start_time'),
             data.get('end_time'), data.get('status'),
             data.get('total_price'), id_booking
         ))
-        connection.commit()
+        try:
+            after_commit(booking_scheduler.schedule, *_transition_times(
+                booking_date, data.get('start_time'), data.get('end_time')))
+        except ValueError:
+            # Format tidak valid, refresh berkala scheduler tetap mengambilnya
+            pass
+        after_commit(cache.invalidate_tags,
+                     calendar_key(existing_booking['id_field'], existing_booking['booking_date']))
+        if booking_date:
+            after_commit(cache.invalidate_tags,
+                         calendar_key(existing_booking['id_field'], booking_date))
+        after_commit(job_queue.enqueue, audit_log, "update", "booking", id_booking,
+                     get_jwt_identity().get('id_users'))
 
         return jsonify({"message": "Booking updated successfully", "id_booking": id_booking}), 200
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         return jsonify({"message": "Error updating booking", "error": str(e)}), 500
-    finally:
-        cursor.close()
-        connection.close()
 
 @booking_endpoints.route('/delete/<int:id_booking>', methods=['DELETE'])
 @jwt_required()
+@transactional
 def delete(id_booking):
     """
-    Route to delete a booking.
+    Route to delete a booking. The row is soft deleted, reads skip it.
     """
     try:
-        connection = get_connection()
-        cursor = connection.cursor(dictionary=True)
+        cursor = get_cursor(dictionary=True)
 
-        check_query = "SELECT * FROM booking WHERE id_booking = %s"
-        cursor.execute(check_query, (id_booking,))
+        cursor.execute(CHECK_BOOKING_QUERY, (id_booking,))
         existing_booking = cursor.fetchone()
 
         if not existing_booking:
             return jsonify({"message": "Booking not found"}), 404
 
-        delete_query = "DELETE FROM booking WHERE id_booking = %s"
-        cursor.execute(delete_query, (id_booking,))
-        connection.commit()
+        cursor.execute(DELETE_BOOKING_QUERY, (id_booking,))
+        after_commit(cache.invalidate_tags,
+                     calendar_key(existing_booking['id_field'], existing_booking['booking_date']))
+        after_commit(job_queue.enqueue, audit_log, "delete", "booking", id_booking,
+                     get_jwt_identity().get('id_users'))
 
         return jsonify({"message": "Booking deleted successfully", "id_booking": id_booking}), 200
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         return jsonify({"message": "Error deleting booking", "error": str(e)}), 500
-    finally:
-        cursor.close()
-        connection.close()
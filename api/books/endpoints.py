@@ -1,7 +1,7 @@
 """Routes for module books"""
 import os
 from flask import Blueprint, jsonify, request
-from helper.db_helper import get_connection
+from helper.db_helper import get_cursor, transactional
 from helper.form_validation import get_form_data
 
 from flask_jwt_extended import jwt_required, get_jwt_identity
@@ -16,30 +16,26 @@ UPLOAD_FOLDER = "img"
 @jwt_required()
 def read():
     """Routes for module get list books"""
-    connection = get_connection()
-    cursor = connection.cursor(dictionary=True)
+    cursor = get_cursor(dictionary=True)
     select_query = "SELECT * FROM tb_books"
     cursor.execute(select_query)
     results = cursor.fetchall()
-    cursor.close()  # Close the cursor after query execution
     return jsonify({"message": "OK", "datas": results}), 200
 
 
 @books_endpoints.route('/create', methods=['POST'])
 @jwt_required()
+@transactional
 def create():
     """Routes for module create a book"""
     required = get_form_data(["title"])  # use only if the field required
     title = required["title"]
     description = request.form['description']
 
-    connection = get_connection()
-    cursor = connection.cursor()
+    cursor = get_cursor()
     insert_query = "INSERT INTO tb_books (title, description) VALUES (%s, %s)"
     request_insert = (title, description)
     cursor.execute(insert_query, request_insert)
-    connection.commit()  # Commit changes to the database
-    cursor.close()
     new_id = cursor.lastrowid  # Get the newly inserted book's ID\
     if new_id:
         return jsonify({"title": title, "message": "Inserted", "id_books": new_id}), 201
@@ -48,17 +44,16 @@ def create():
 
 @books_endpoints.route('/update/<product_id>', methods=['PUT'])
 @jwt_required()
+@transactional
 def update(product_id):
     """Routes for module update a book"""
-    connection = get_connection()
-    cursor = connection.cursor(dictionary=True)
+    cursor = get_cursor(dictionary=True)
     
     check_query = "SELECT * FROM tb_books WHERE id_books = %s"
     cursor.execute(check_query, (product_id,))
     existing_book = cursor.fetchone()
     
     if not existing_book:
-        cursor.close()
         return jsonify({"error": "Data not found or has been deleted"}), 404
 
     # Jika data ditemukan, lakukan pembaruan
@@ -68,8 +63,6 @@ def update(product_id):
     update_query = "UPDATE tb_books SET title=%s, description=%s WHERE id_books=%s"
     update_request = (title, description, product_id)
     cursor.execute(update_query, update_request)
-    connection.commit()
-    cursor.close()
     
     data = {"message": "updated", "id_books": product_id}
     return jsonify(data), 200
@@ -78,10 +71,10 @@ def update(product_id):
 
 @books_endpoints.route('/delete/<product_id>', methods=['DELETE'])
 @jwt_required()
+@transactional
 def delete(product_id):
     """Routes for module to delete a book"""
-    connection = get_connection()
-    cursor = connection.cursor(dictionary=True)
+    cursor = get_cursor(dictionary=True)
     
     # check_query = "SELECT * FROM tb_books WHERE id_books = %s"
     # cursor.execute(check_query, (product_id,))
@@ -95,8 +88,6 @@ def delete(product_id):
     cursor.execute(delete_query, (product_id,))
     if cursor.rowcount == 0:
         return jsonify({"err_message" : "Data cant deleted"}), 400
-    connection.commit()
-    cursor.close()
     
     data = {"message": "Data deleted", "id_books": product_id}
     return jsonify(data), 200
@@ -1,20 +1,69 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from flask_bcrypt import Bcrypt
+import csv
 import logging
 
-from helper.db_helper import get_connection
+from extensions import cache, idempotency, job_queue
+from helper.admission import DeadlineExceeded, extend_deadline
+from helper.audit import audit_log
+from helper.bulk_io import MIMETYPES, detect_format, iter_encoded, iter_rows
+from helper.db_helper import after_commit, get_cursor, get_db, release_db, transactional
+from helper.query_registry import register_query
+from helper.response_format import columnar_response, requested_format
 
 # Setup bcrypt and Blueprint
 bcrypt = Bcrypt()
 list_field_endpoints = Blueprint('list_field', __name__)  # Blueprint name corrected for clarity
+# Import/export berjalan lama, blueprint terpisah supaya punya limit admission sendiri
+list_field_bulk_endpoints = Blueprint('list_field_bulk', __name__)
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
+# Setup logging, handlers are configured once in app.py
 logger = logging.getLogger(__name__)
 
+READ_BY_OWNER_QUERY = register_query(
+    "list_field.read.owner",
+    "SELECT * FROM list_field WHERE id_users = %s AND deleted_at IS NULL", (1,))
+READ_ALL_QUERY = register_query(
+    "list_field.read.all", "SELECT * FROM list_field WHERE deleted_at IS NULL",
+    allow_full_scan=("list_field",))
+CHECK_FIELD_QUERY = register_query(
+    "list_field.check", "SELECT * FROM list_field WHERE id_field = %s AND deleted_at IS NULL",
+    (1,))
+UPDATE_FIELD_QUERY = register_query("list_field.update", """
+UPDATE list_field
+SET field_name=%s, address=%s, description=%s, field_type=%s, price=%s, image_url=%s
+WHERE id_field=%s
+""", ("name", "address", "description", "type", 0, "", 1))
+DELETE_FIELD_QUERY = register_query(
+    "list_field.delete", "UPDATE list_field SET deleted_at = NOW() WHERE id_field = %s", (1,))
+INSERT_FIELD_QUERY = """
+INSERT INTO list_field (field_name, address, description, field_type, capacity, price, image_url, id_users)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+# Bulk import/export tuning
+BULK_BATCH_SIZE = 500
+BULK_MAX_ERRORS = 1000
+BULK_DEADLINE = 600
+
+def _read_cache_key():
+    """Owners see their own fields, renters share one entry"""
+    if get_jwt().get('roles') == 'Owner':
+        return f"list_field_read:user:{get_jwt_identity().get('id_users')}"
+    return "list_field_read:all"
+
+
+def _read_cache_tags():
+    """Dropped by list_field writes, see create/update/delete/import"""
+    if get_jwt().get('roles') == 'Owner':
+        return (f"user:{get_jwt_identity().get('id_users')}",)
+    return ("list_field",)
+
+
 @list_field_endpoints.route('/read', methods=['GET'])
 @jwt_required()
+@cache.cached_view(_read_cache_key, tags=_read_cache_tags)
 def read():
     """
     Route to fetch all data from the list_field table.
@@ -24,34 +73,36 @@ def read():
     id_users = identity.get('id_users')
     jwt_claims = get_jwt()  # Mengambil additional_claims dari token JWT
     role = jwt_claims.get('roles')  # Ambil roles dari klaim tambahan
+    fmt = requested_format()
 
-    connection = get_connection()
     try:
-        cursor = connection.cursor(dictionary=True)
+        # Compact formats are built from the cursor tuples, no dict per row
+        cursor = get_cursor(dictionary=fmt is None)
 
         # Jika role adalah 'Owner', filter berdasarkan id_users
         if role == 'Owner':
-            select_query = "SELECT * FROM list_field WHERE id_users = %s"
-            cursor.execute(select_query, (id_users,))
+            cursor.execute(READ_BY_OWNER_QUERY, (id_users,))
         else:  # Jika role adalah 'User', ambil semua data
-            select_query = "SELECT * FROM list_field"
-            cursor.execute(select_query)
+            cursor.execute(READ_ALL_QUERY)
 
         results = cursor.fetchall()
-        logger.info(f"Fetched data from list_field for role {role}.")
+        columns = cursor.column_names
+        logger.info("Fetched data from list_field for role %s.", role)
+    except DeadlineExceeded:
+        # Biarkan error handler admission membalas 503 + Retry-After
+        raise
     except Exception as e:
-        logger.error(f"Error fetching data from list_field for role {role}: {str(e)}")
+        logger.error("Error fetching data from list_field for role %s: %s", role, e)
         return jsonify({"message": "Error fetching data", "error": str(e)}), 500
-    finally:
-        if cursor:
-            cursor.close()
-        if connection:
-            connection.close()
 
+    if fmt:
+        return columnar_response(fmt, columns, results, message="OK")
     return jsonify({"message": "OK", "data": results}), 200
 
 @list_field_endpoints.route('/create', methods=['POST'])
 @jwt_required()
+@idempotency.idempotent
+@transactional
 def create():
     """
     Route to create a new field in the `list_field` table using form-data.
@@ -76,21 +127,15 @@ def create():
         price = float(request.form.get("price", 0.0))
         image_url = request.form.get("image_url", "")
 
-        # Database connection (use context manager for proper resource handling)
-        connection = get_connection()
-        cursor = connection.cursor()
+        cursor = get_cursor()
 
         # Insert query
-        insert_query = """
-        INSERT INTO list_field (field_name, address, description, field_type, capacity, price, image_url, id_users) 
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        cursor.execute(insert_query, (field_name, address, description, field_type, capacity, price, image_url, id_users))
-        connection.commit()
+        cursor.execute(INSERT_FIELD_QUERY, (field_name, address, description, field_type, capacity, price, image_url, id_users))
 
         # Get the newly inserted field ID
         new_id = cursor.lastrowid
-        cursor.close()
+        after_commit(cache.invalidate_tags, f"user:{id_users}", "list_field")
+        after_commit(job_queue.enqueue, audit_log, "create", "list_field", new_id, id_users)
 
         if new_id:
             return jsonify({
@@ -102,28 +147,28 @@ def create():
 
     except ValueError as ve:
         return jsonify({"message": "Validation error", "error": str(ve)}), 400
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         return jsonify({"message": "Error creating field", "error": str(e)}), 500
 
 
-@list_field_endpoints.route('/update/<id_field>', methods=['PUT'])
+@list_field_endpoints.route('/update/<int:id_field>', methods=['PUT'])
 @jwt_required()
+@transactional
 def update(id_field):
     """
     Route to update a specific field in the list_field table.
     """
-    connection = get_connection()
-    cursor = None
     try:
-        cursor = connection.cursor(dictionary=True)
+        cursor = get_cursor(dictionary=True)
 
         # Check if the data exists
-        check_query = "SELECT * FROM list_field WHERE id_field = %s"
-        cursor.execute(check_query, (id_field,))
+        cursor.execute(CHECK_FIELD_QUERY, (id_field,))
         existing_field = cursor.fetchone()
 
         if not existing_field:
-            logger.warning(f"Data with id_field {id_field} not found.")
+            logger.warning("Data with id_field %s not found.", id_field)
             return jsonify({"error": "Data not found or has been deleted"}), 404
 
         # If data is found, proceed with the update
@@ -140,62 +185,228 @@ def update(id_field):
         if not all([field_name, address, description, field_type, price, image_url]):
             return jsonify({"error": "All fields must be provided"}), 400
 
-        # Prepare the update query
-        update_query = """
-        UPDATE list_field
-        SET field_name=%s, address=%s, description=%s, field_type=%s, price=%s, image_url=%s
-        WHERE id_field=%s
-        """
         update_request = (field_name, address, description, field_type, price, image_url, id_field)
-        cursor.execute(update_query, update_request)
-        connection.commit()
+        cursor.execute(UPDATE_FIELD_QUERY, update_request)
+        after_commit(cache.invalidate_tags, f"field:{id_field}",
+                     f"user:{existing_field['id_users']}", "list_field")
+        after_commit(job_queue.enqueue, audit_log, "update", "list_field", id_field,
+                     get_jwt_identity().get('id_users'))
 
-        logger.info(f"Updated data for id_field {id_field}.")
+        logger.info("Updated data for id_field %s.", id_field)
         return jsonify({"message": "Updated successfully", "id_field": id_field}), 200
 
+    except DeadlineExceeded:
+        raise
     except Exception as e:
-        logger.error(f"Error updating data for id_field {id_field}: {str(e)}")
+        logger.error("Error updating data for id_field %s: %s", id_field, e)
         return jsonify({"message": "Error updating data", "error": str(e)}), 500
 
-    finally:
-        # Ensure cursor and connection are closed
-        if cursor:
-            cursor.close()
-        if connection:
-            connection.close()
-
 @list_field_endpoints.route('/delete/<int:id_field>', methods=['DELETE'])
 @jwt_required()
+@transactional
 def delete(id_field):
     """
-    Route to delete a field from the `list_field` table.a
+    Route to delete a field from the `list_field` table. The row is soft
+    deleted, so existing bookings keep their field.
     """
-    connection = get_connection()
     try:
-        cursor = connection.cursor(dictionary=True)
+        cursor = get_cursor(dictionary=True)
 
         # Check if the record exists
-        check_query = "SELECT * FROM list_field WHERE id_field = %s"
-        cursor.execute(check_query, (id_field,))
+        cursor.execute(CHECK_FIELD_QUERY, (id_field,))
         existing_field = cursor.fetchone()
 
         if not existing_field:
-            logger.warning(f"Field with ID {id_field} not found.")
+            logger.warning("Field with ID %s not found.", id_field)
             return jsonify({"message": "Field not found or already deleted"}), 404
 
         # Proceed with deletion
-        delete_query = "DELETE FROM list_field WHERE id_field = %s"
-        cursor.execute(delete_query, (id_field,))
-        connection.commit()
+        cursor.execute(DELETE_FIELD_QUERY, (id_field,))
+        after_commit(cache.invalidate_tags, f"field:{id_field}",
+                     f"user:{existing_field['id_users']}", "list_field")
+        after_commit(job_queue.enqueue, audit_log, "delete", "list_field", id_field,
+                     get_jwt_identity().get('id_users'))
 
-        logger.info(f"Deleted field with ID {id_field}.")
+        logger.info("Deleted field with ID %s.", id_field)
         return jsonify({"message": "Field deleted successfully", "id_field": id_field}), 200
+    except DeadlineExceeded:
+        raise
     except Exception as e:
-        logger.error(f"Error deleting field with ID {id_field}: {str(e)}")
+        logger.error("Error deleting field with ID %s: %s", id_field, e)
         return jsonify({"message": "Error deleting field", "error": str(e)}), 500
-    finally:
-        if cursor:
-            cursor.close()
-        if connection:
-            connection.close()
 
+
+def _parse_field_row(row, id_users):
+    """
+    Validate one imported row, with the same defaults as `create`.
+
+    Returns:
+        tuple: Parameters for INSERT_FIELD_QUERY.
+
+    Raises:
+        ValueError: If a required field is missing, a text field is not a
+            string or a number is invalid.
+    """
+    field_name = _text_value(row, "field_name").strip()
+    address = _text_value(row, "address").strip()
+    if not field_name or not address:
+        raise ValueError("Missing required fields: field_name or address")
+    return (
+        field_name,
+        address,
+        _text_value(row, "description"),
+        _text_value(row, "field_type") or "Unknown",
+        int(row.get("capacity") or 0),
+        float(row.get("price") or 0.0),
+        _text_value(row, "image_url"),
+        id_users,
+    )
+
+
+def _text_value(row, name):
+    """Text column of an imported row, NDJSON values may be any JSON type"""
+    value = row.get(name)
+    if value is None:
+        return ""
+    if not isinstance(value, str):
+        raise ValueError(f"{name} must be a string")
+    return value
+
+
+@list_field_bulk_endpoints.route('/import', methods=['POST'])
+@jwt_required()
+def import_fields():
+    """
+    Route to bulk create fields from an uploaded CSV or NDJSON file.
+
+    Rows are validated as they are read and inserted in batches, so memory
+    stays flat for large files. Invalid rows are skipped and reported.
+    """
+    id_users = get_jwt_identity().get('id_users')
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({"message": "Missing file"}), 400
+    try:
+        fmt = detect_format(request.args.get('format'), upload.filename)
+    except ValueError as e:
+        return jsonify({"message": "Validation error", "error": str(e)}), 400
+
+    extend_deadline(BULK_DEADLINE)
+    inserted = 0
+    failed = 0
+    errors = []
+
+    def report(row_numbers, error):
+        nonlocal failed
+        failed += len(row_numbers)
+        for row_number in row_numbers:
+            if len(errors) < BULK_MAX_ERRORS:
+                errors.append({"row": row_number, "error": error})
+
+    # Satu commit per batch, bukan satu transaksi untuk seluruh file
+    try:
+        connection = get_db()
+        cursor = get_cursor()
+        batch = []
+        batch_rows = []
+
+        def flush():
+            nonlocal inserted
+            try:
+                cursor.executemany(INSERT_FIELD_QUERY, batch)
+                connection.commit()
+                inserted += len(batch)
+            except Exception as e:
+                connection.rollback()
+                logger.warning("Batch of rows %s-%s failed, retrying row by row: %s",
+                               batch_rows[0], batch_rows[-1], e)
+                # Satu baris buruk tidak boleh menggagalkan seluruh batch
+                for row_number, params in zip(batch_rows, batch):
+                    try:
+                        cursor.execute(INSERT_FIELD_QUERY, params)
+                        connection.commit()
+                        inserted += 1
+                    except Exception as row_error:
+                        connection.rollback()
+                        report([row_number], str(row_error))
+            batch.clear()
+            batch_rows.clear()
+
+        for row_number, row in iter_rows(upload.stream, fmt):
+            if isinstance(row, ValueError):
+                report([row_number], str(row))
+                continue
+            try:
+                batch.append(_parse_field_row(row, id_users))
+                batch_rows.append(row_number)
+            except (TypeError, ValueError) as e:
+                report([row_number], str(e))
+                continue
+            if len(batch) >= BULK_BATCH_SIZE:
+                flush()
+        if batch:
+            flush()
+    except UnicodeDecodeError as e:
+        return jsonify({"message": "File must be UTF-8 encoded", "error": str(e),
+                        "inserted": inserted}), 400
+    except csv.Error as e:
+        return jsonify({"message": "Invalid CSV file", "error": str(e),
+                        "inserted": inserted}), 400
+
+    logger.info("Imported %s fields for id_users=%s, %s rows failed", inserted, id_users, failed)
+    if inserted:
+        cache.invalidate_tags(f"user:{id_users}", "list_field")
+    job_queue.enqueue(audit_log, "import", "list_field", None, id_users)
+    return jsonify({
+        "message": "Import finished",
+        "inserted": inserted,
+        "failed": failed,
+        "errors": errors,
+        "errors_truncated": failed > len(errors),
+    }), 200
+
+
+@list_field_bulk_endpoints.route('/export', methods=['GET'])
+@jwt_required()
+def export_fields():
+    """
+    Route to stream fields as CSV or NDJSON, with the same visibility as `read`.
+    """
+    fmt = request.args.get('format', 'csv')
+    if fmt not in MIMETYPES:
+        return jsonify({"message": "format must be csv or ndjson"}), 400
+    id_users = get_jwt_identity().get('id_users')
+    role = get_jwt().get('roles')
+
+    extend_deadline(BULK_DEADLINE)
+    try:
+        # Unbuffered cursor, rows are pulled from MySQL one batch at a time
+        cursor = get_cursor(buffered=False)
+        if role == 'Owner':
+            cursor.execute(READ_BY_OWNER_QUERY, (id_users,))
+        else:
+            cursor.execute(READ_ALL_QUERY)
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        logger.error("Error exporting list_field for role %s: %s", role, e)
+        return jsonify({"message": "Error exporting data", "error": str(e)}), 500
+
+    def batches():
+        exhausted = False
+        try:
+            while True:
+                rows = cursor.fetchmany(BULK_BATCH_SIZE)
+                if not rows:
+                    exhausted = True
+                    return
+                yield rows
+        finally:
+            # Stream selesai, kembalikan koneksi tanpa menunggu teardown.
+            # Client putus di tengah: masih ada baris belum dibaca, buang koneksinya
+            release_db(discard=not exhausted)
+
+    body = iter_encoded(fmt, list(cursor.column_names), batches())
+    response = Response(stream_with_context(body), mimetype=MIMETYPES[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename=list_field.{fmt}'
+    return response
@@ -0,0 +1,16 @@
+"""Routes for module metrics"""
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required
+
+from extensions import admission, cache
+
+metrics_endpoints = Blueprint('metrics', __name__)
+
+
+@metrics_endpoints.route('/', methods=['GET'])
+@jwt_required()
+def get_metrics():
+    """Cache and admission statistics of this worker"""
+    return jsonify({"message": "OK",
+                    "cache": cache.stats(),
+                    "admission": admission.stats()}), 200
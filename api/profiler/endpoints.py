@@ -0,0 +1,87 @@
+"""Routes for module profiler, mounted only when PROFILER_ENABLED"""
+from flask import Blueprint, Response, jsonify, request
+from flask_jwt_extended import jwt_required
+
+from extensions import profiler
+from helper.admission import extend_deadline
+from helper.profiler import folded, summarize
+
+profiler_endpoints = Blueprint('profiler', __name__)
+
+MEMORY_GROUPS = ('lineno', 'filename', 'traceback')
+
+
+@profiler_endpoints.before_request
+def check_token():
+    """Every profiler route needs the profiler token on top of the JWT"""
+    if not profiler.authorized():
+        return jsonify({"message": "Invalid or missing X-Profiler-Token"}), 403
+    return None
+
+
+@profiler_endpoints.route('/cpu', methods=['GET'])
+@jwt_required()
+def cpu():
+    """
+    Sample the request threads of this worker for `seconds`.
+
+    `?format=folded` returns folded stacks for flamegraph.pl or speedscope,
+    one flame graph per route; `?route=booking.read` keeps a single route.
+    """
+    try:
+        seconds = float(request.args.get('seconds', 5))
+        interval = float(request.args.get('interval', profiler.interval))
+        limit = int(request.args.get('limit', 30))
+    except ValueError as e:
+        return jsonify({"message": "Invalid parameters", "error": str(e)}), 400
+    if seconds <= 0 or not 0.001 <= interval <= 1:
+        return jsonify({"message": "seconds must be positive and interval within 0.001-1"}), 400
+    seconds = min(seconds, profiler.max_seconds)
+
+    extend_deadline(seconds + 5)
+    stacks = profiler.sample_cpu(seconds, interval, route=request.args.get('route'),
+                                 all_threads=request.args.get('threads') == 'all')
+    if stacks is None:
+        return jsonify({"message": "A CPU profile is already running in this worker"}), 409
+
+    if request.args.get('format') == 'folded':
+        return Response(folded(stacks), mimetype='text/plain')
+    return jsonify({"message": "OK", "seconds": seconds, "interval_ms": interval * 1000,
+                    **summarize(stacks, limit)}), 200
+
+
+@profiler_endpoints.route('/memory/start', methods=['POST'])
+@jwt_required()
+def memory_start():
+    """Start tracemalloc and take the baseline for the growth report"""
+    try:
+        frames = int(request.args.get('frames', 10))
+    except ValueError as e:
+        return jsonify({"message": "Invalid parameters", "error": str(e)}), 400
+    profiler.start_memory(max(1, min(frames, 64)))
+    return jsonify({"message": "tracemalloc started"}), 200
+
+
+@profiler_endpoints.route('/memory', methods=['GET'])
+@jwt_required()
+def memory():
+    """Top allocators now, and their growth since `memory/start`"""
+    group_by = request.args.get('group_by', 'lineno')
+    if group_by not in MEMORY_GROUPS:
+        return jsonify({"message": f"group_by must be one of {', '.join(MEMORY_GROUPS)}"}), 400
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError as e:
+        return jsonify({"message": "Invalid parameters", "error": str(e)}), 400
+    report = profiler.memory_report(limit, group_by)
+    if report is None:
+        return jsonify({"message": "tracemalloc is not running, POST memory/start first"}), 409
+    return jsonify({"message": "OK", **report}), 200
+
+
+@profiler_endpoints.route('/memory/stop', methods=['POST'])
+@jwt_required()
+def memory_stop():
+    """Stop tracemalloc, tracing slows every allocation down"""
+    profiler.stop_memory()
+    return jsonify({"message": "tracemalloc stopped"}), 200
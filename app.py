@@ -3,12 +3,17 @@
 from flask import Flask
 from flask_cors import CORS
 from dotenv import load_dotenv
-from extensions import jwt
+from extensions import (jwt, booking_scheduler, booking_archiver, idempotency, job_queue,
+                        cache, admission, profiler)
 from api.auth.endpoints import auth_endpoints
 from api.data_protected.endpoints import protected_endpoints
-from api.list_field.endpoints import list_field_endpoints
+from api.list_field.endpoints import list_field_bulk_endpoints, list_field_endpoints
 from api.booking.endpoint import booking_endpoints
+from api.metrics.endpoints import metrics_endpoints
+from api.profiler.endpoints import profiler_endpoints
 from config import Config
+from helper import db_helper
+from helper.logging_setup import configure_logging
 from static.static_file_server import static_file_server
 
 
@@ -17,17 +22,32 @@ load_dotenv()
 
 app = Flask(__name__)
 app.config.from_object(Config)
+configure_logging(app)
+admission.init_app(app)
+# Dipasang setelah admission supaya koneksi kembali ke pool sebelum slot dilepas
+db_helper.init_app(app)
 CORS(app)
 
 
 jwt.init_app(app)
+booking_scheduler.init_app(app)
+booking_archiver.init_app(app)
+idempotency.init_app(app)
+job_queue.init_app(app)
+cache.init_app(app)
+profiler.init_app(app)
 
 # register the blueprint
 app.register_blueprint(auth_endpoints, url_prefix='/api/v1/auth')
 app.register_blueprint(list_field_endpoints, url_prefix='/api/v1/list_field')
+app.register_blueprint(list_field_bulk_endpoints, url_prefix='/api/v1/list_field')
 app.register_blueprint(booking_endpoints, url_prefix='/api/v1/booking')
 app.register_blueprint(protected_endpoints, url_prefix='/api/v1/protected')
+app.register_blueprint(metrics_endpoints, url_prefix='/api/v1/metrics')
 app.register_blueprint(static_file_server, url_prefix='/static/')
+# Profiler hanya dipasang jika PROFILER_ENABLED dan PROFILER_TOKEN diisi
+if profiler.enabled:
+    app.register_blueprint(profiler_endpoints, url_prefix='/api/v1/profiler')
 
 
 if __name__ == '__main__':
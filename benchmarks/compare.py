@@ -0,0 +1,80 @@
+"""
+Compare two benchmark result files written by `benchmarks.run --output`.
+
+Usage:
+    python -m benchmarks.compare baseline.json candidate.json --threshold 10
+
+Exits with status 1 when an endpoint's p95 latency got worse, or its
+throughput dropped, by more than `--threshold` percent, or when the share
+of requests shed with a 503 grew by more than `--threshold` points.
+"""
+import argparse
+import json
+import sys
+
+
+def _change(old, new):
+    if not old or new is None:
+        return None
+    return (new - old) / old * 100
+
+
+def compare(baseline, candidate, threshold):
+    """
+    Returns:
+        tuple: A list of (name, metric, old, new, change %) rows and whether
+        any of them regressed beyond `threshold`.
+    """
+    old_results = {result["name"]: result for result in baseline["results"]}
+    rows = []
+    regressed = False
+    for result in candidate["results"]:
+        old = old_results.get(result["name"])
+        if old is None:
+            continue
+        for metric, old_value, new_value, higher_is_better in (
+                ("rps", old["throughput_rps"], result["throughput_rps"], True),
+                ("p50 ms", old["latency_ms"]["p50"], result["latency_ms"]["p50"], False),
+                ("p95 ms", old["latency_ms"]["p95"], result["latency_ms"]["p95"], False),
+                ("p99 ms", old["latency_ms"]["p99"], result["latency_ms"]["p99"], False),
+                ("rss MB", old["peak_rss_mb"], result["peak_rss_mb"], False)):
+            change = _change(old_value, new_value)
+            rows.append((result["name"], metric, old_value, new_value, change))
+            if change is None or metric not in ("rps", "p95 ms"):
+                continue
+            worse = -change if higher_is_better else change
+            if worse > threshold:
+                regressed = True
+        # Dalam poin persen, baseline sering 0 sehingga perubahan relatif tidak ada artinya
+        old_shed = old.get("shed_pct") or 0.0
+        new_shed = result.get("shed_pct") or 0.0
+        rows.append((result["name"], "shed %", old_shed, new_shed, None))
+        if new_shed - old_shed > threshold:
+            regressed = True
+    return rows, regressed
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Allowed regression in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)
+    with open(args.candidate, encoding="utf-8") as candidate_file:
+        candidate = json.load(candidate_file)
+
+    rows, regressed = compare(baseline, candidate, args.threshold)
+    print(f"{baseline.get('commit')} -> {candidate.get('commit')}")
+    for name, metric, old_value, new_value, change in rows:
+        change_text = "n/a" if change is None else f"{change:+.1f}%"
+        print(f"{name:<26}{metric:<8}{old_value!s:>10}{new_value!s:>10}{change_text:>10}")
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == '__main__':
+    main()
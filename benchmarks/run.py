@@ -0,0 +1,297 @@
+"""
+Drive every blueprint and report throughput, latency percentiles and RSS.
+
+Usage:
+    python -m benchmarks.run --mode client --requests 2000 --concurrency 8
+    python -m benchmarks.run --mode http --concurrency 32 --output results.json
+
+`client` calls the app through the Flask test client, which measures the
+handlers and the database without any network overhead. `http` starts the
+app on a threaded werkzeug server and sends real HTTP requests, which also
+covers the WSGI server and sockets. Seed the database with
+`python -m benchmarks.seed` first.
+
+503 responses (load shedding by admission control, or a missed request
+deadline) are reported as `shed` and left out of the throughput and the
+latency percentiles, which only cover requests that were served. With
+`--concurrency` above a blueprint's `ADMISSION_LIMITS` entry, watch `shed`.
+"""
+import argparse
+import json
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+from werkzeug.serving import make_server
+
+from app import app
+from benchmarks.seed import BENCH_PASSWORD, owner_username, renter_username
+
+# name, method, path, logged in as, form data
+SCENARIOS = [
+    ("auth/login", "POST", "/api/v1/auth/login", None, "login"),
+    ("auth/read", "GET", "/api/v1/auth/read", None, None),
+    ("protected/data", "GET", "/api/v1/protected/data", "renter", None),
+    ("list_field/read owner", "GET", "/api/v1/list_field/read", "owner", None),
+    ("list_field/read renter", "GET", "/api/v1/list_field/read", "renter", None),
+    ("booking/read", "GET", "/api/v1/booking/read", "renter", None),
+    ("booking/read_by_owner", "GET", "/api/v1/booking/read_by_owner", "owner", None),
+    ("booking/create", "POST", "/api/v1/booking/create", "renter", "booking"),
+]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = max(int(round(pct / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    if sys.platform == "darwin":
+        return round(peak / (1024 * 1024), 1)
+    return round(peak / 1024, 1)
+
+
+class TestClientTransport:
+    """Send requests through the Flask test client"""
+
+    name = "client"
+
+    def __init__(self, flask_app):
+        self.app = flask_app
+        self._local = threading.local()
+
+    def request(self, method, path, headers, data):
+        """Returns the status code"""
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, headers=headers, data=data)
+        response.close()
+        return response.status_code
+
+    def close(self):
+        """Nothing to release"""
+
+
+class HttpTransport:
+    """Serve the app with a threaded werkzeug server and call it over HTTP"""
+
+    name = "http"
+
+    def __init__(self, flask_app, host="127.0.0.1", port=0):
+        self.server = make_server(host, port, flask_app, threaded=True)
+        self.base_url = f"http://{host}:{self.server.server_port}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def request(self, method, path, headers, data):
+        """Returns the status code"""
+        body = urllib.parse.urlencode(data).encode() if data else None
+        request = urllib.request.Request(
+            self.base_url + path, data=body, headers=headers or {}, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+    def close(self):
+        """Stop the server"""
+        self.server.shutdown()
+
+
+class DataFactory:
+    """Build form data and tokens for the scenarios"""
+
+    def __init__(self, renters, fields_sample):
+        self.renters = renters
+        self.fields_sample = fields_sample
+        self._tokens = {}
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def _next(self):
+        with self._lock:
+            self._counter += 1
+            return self._counter
+
+    def token(self, role):
+        """Log in the first seeded user of `role` once and reuse the token"""
+        if role not in self._tokens:
+            username = owner_username(0) if role == "owner" else renter_username(0)
+            client = app.test_client()
+            response = client.post("/api/v1/auth/login",
+                                   data={"username": username, "password": BENCH_PASSWORD})
+            if response.status_code != 200:
+                raise RuntimeError(
+                    f"Cannot log in as {username}, seed the database first: {response.json}")
+            self._tokens[role] = response.json["access_token"]
+        return self._tokens[role]
+
+    def headers(self, role):
+        """Authorization header for `role`, if any"""
+        if role is None:
+            return {}
+        return {"Authorization": f"Bearer {self.token(role)}"}
+
+    def form(self, kind):
+        """Form data for one request"""
+        n = self._next()
+        if kind == "login":
+            return {"username": renter_username(n % self.renters), "password": BENCH_PASSWORD}
+        if kind == "booking":
+            booking_date = date.today() + timedelta(days=30 + n % 300)
+            start_hour = 6 + n % 15
+            return {
+                "id_field": self.fields_sample[n % len(self.fields_sample)],
+                "booking_date": booking_date.isoformat(),
+                "start_time": f"{start_hour:02}:00:00",
+                "end_time": f"{start_hour + 1:02}:00:00",
+            }
+        return None
+
+
+def run_scenario(transport, factory, scenario, requests, concurrency):
+    """Fire `requests` requests at `concurrency` and summarise the latencies"""
+    name, method, path, role, kind = scenario
+    headers = factory.headers(role)
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def one(_):
+        data = factory.form(kind) if kind else None
+        started = time.perf_counter()
+        status = transport.request(method, path, headers, data)
+        elapsed = time.perf_counter() - started
+        with lock:
+            # Request yang ditolak cepat tidak boleh terlihat sebagai perbaikan latency
+            if status != 503:
+                latencies.append(elapsed)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    rss_before = peak_rss_mb()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(requests)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    shed = statuses.get(503, 0)
+    errors = sum(count for status, count in statuses.items() if status >= 500 and status != 503)
+    return {
+        "name": name,
+        "method": method,
+        "path": path,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "shed": shed,
+        "shed_pct": round(100.0 * shed / requests, 2) if requests else None,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        # Hanya request yang benar-benar dilayani
+        "throughput_rps": round((requests - shed) / wall, 1) if wall else None,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+            "p50": round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+            "p95": round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+            "p99": round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+            "max": round(latencies[-1] * 1000, 2) if latencies else None,
+        },
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_rss_growth_mb": round(peak_rss_mb() - rss_before, 1),
+    }
+
+
+def git_commit():
+    """Current commit, to label the results"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results):
+    """Human readable summary"""
+    header = f"{'endpoint':<26}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}" \
+             f"{'errors':>8}{'shed':>8}{'rss MB':>9}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        latency = result["latency_ms"]
+        print(f"{result['name']:<26}{result['throughput_rps']:>10}{latency['p50']!s:>10}"
+              f"{latency['p95']!s:>10}{latency['p99']!s:>10}{result['errors']:>8}"
+              f"{result['shed']:>8}{result['peak_rss_mb']:>9}")
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mode", choices=["client", "http"], default="client")
+    parser.add_argument("--requests", type=int, default=1000,
+                        help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=20,
+                        help="Requests per endpoint before measuring")
+    parser.add_argument("--only", action="append",
+                        help="Run only the named endpoint, can be repeated")
+    parser.add_argument("--renters", type=int, default=500,
+                        help="Number of seeded renters")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    transport = TestClientTransport(app) if args.mode == "client" else HttpTransport(app)
+    try:
+        factory = DataFactory(args.renters, [])
+        owner_token = factory.token("owner")
+        response = app.test_client().get(
+            "/api/v1/list_field/read", headers={"Authorization": f"Bearer {owner_token}"})
+        factory.fields_sample = [field["id_field"] for field in response.json.get("data", [])]
+        if not factory.fields_sample:
+            raise RuntimeError("The seeded owner has no fields, seed the database first")
+
+        scenarios = [s for s in SCENARIOS if not args.only or s[0] in args.only]
+        results = []
+        for scenario in scenarios:
+            if args.warmup:
+                run_scenario(transport, factory, scenario, args.warmup, args.concurrency)
+            results.append(run_scenario(
+                transport, factory, scenario, args.requests, args.concurrency))
+    finally:
+        transport.close()
+
+    print_table(results)
+    if args.output:
+        report = {
+            "version": 1,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "mode": transport.name,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+Seed the local database with a benchmark dataset.
+
+Usage:
+    python -m benchmarks.seed --owners 50 --renters 500 --fields 1000 --bookings 1000000
+
+All seeded users share the password in BENCH_PASSWORD and their usernames
+start with BENCH_PREFIX, so `--reset` can remove a previous dataset.
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from flask_bcrypt import Bcrypt
+
+from helper.db_helper import get_connection
+
+BENCH_PREFIX = "bench_"
+BENCH_PASSWORD = "benchpass"
+OWNER_ROLE = "Owner"
+RENTER_ROLE = "User"
+FIELD_TYPES = ["Futsal", "Badminton", "Basket", "Tennis", "Voli"]
+
+
+def owner_username(index):
+    """Username of the seeded owner number `index`"""
+    return f"{BENCH_PREFIX}owner_{index}"
+
+
+def renter_username(index):
+    """Username of the seeded renter number `index`"""
+    return f"{BENCH_PREFIX}renter_{index}"
+
+
+def _insert_batches(connection, query, rows, batch_size):
+    """Insert `rows` with executemany, committing every `batch_size` rows"""
+    cursor = connection.cursor()
+    try:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                cursor.executemany(query, batch)
+                connection.commit()
+                batch = []
+        if batch:
+            cursor.executemany(query, batch)
+            connection.commit()
+    finally:
+        cursor.close()
+
+
+def _user_ids(connection, pattern):
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "SELECT id_users FROM users WHERE username LIKE %s ORDER BY id_users", (pattern,))
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def reset(connection):
+    """Remove the rows created by a previous seed run"""
+    cursor = connection.cursor()
+    try:
+        like = f"{BENCH_PREFIX}%"
+        cursor.execute(
+            "DELETE b FROM booking b JOIN users u ON b.id_users = u.id_users "
+            "WHERE u.username LIKE %s", (like,))
+        cursor.execute(
+            "DELETE ba FROM booking_archive ba JOIN users u ON ba.id_users = u.id_users "
+            "WHERE u.username LIKE %s", (like,))
+        cursor.execute(
+            "DELETE lf FROM list_field lf JOIN users u ON lf.id_users = u.id_users "
+            "WHERE u.username LIKE %s", (like,))
+        cursor.execute("DELETE FROM users WHERE username LIKE %s", (like,))
+        connection.commit()
+    finally:
+        cursor.close()
+
+
+def seed(owners, renters, fields, bookings, days=365, batch_size=5000, random_seed=42):
+    """
+    Seed users, fields and bookings.
+
+    Returns:
+        dict: Number of rows inserted per table and the elapsed seconds.
+    """
+    rng = random.Random(random_seed)
+    started = time.perf_counter()
+    # bcrypt is slow on purpose, hash once and share it
+    hashed_password = Bcrypt().generate_password_hash(BENCH_PASSWORD).decode('utf-8')
+
+    connection = get_connection()
+    try:
+        _insert_batches(
+            connection,
+            "INSERT INTO users (username, password, role) VALUES (%s, %s, %s)",
+            ((owner_username(i), hashed_password, OWNER_ROLE) for i in range(owners)),
+            batch_size)
+        _insert_batches(
+            connection,
+            "INSERT INTO users (username, password, role) VALUES (%s, %s, %s)",
+            ((renter_username(i), hashed_password, RENTER_ROLE) for i in range(renters)),
+            batch_size)
+        owner_ids = _user_ids(connection, f"{BENCH_PREFIX}owner_%")
+        renter_ids = _user_ids(connection, f"{BENCH_PREFIX}renter_%")
+
+        _insert_batches(
+            connection,
+            "INSERT INTO list_field (field_name, address, description, field_type, capacity, "
+            "price, image_url, id_users) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+            ((f"Bench Field {i}", f"Jl. Benchmark No. {i}", "Seeded for benchmarks",
+              rng.choice(FIELD_TYPES), rng.randint(2, 22), rng.randint(50, 300), "",
+              owner_ids[i % len(owner_ids)]) for i in range(fields)),
+            batch_size)
+
+        cursor = connection.cursor()
+        try:
+            cursor.execute(
+                "SELECT lf.id_field, lf.price FROM list_field lf "
+                "JOIN users u ON lf.id_users = u.id_users WHERE u.username LIKE %s",
+                (f"{BENCH_PREFIX}owner_%",))
+            field_rows = cursor.fetchall()
+        finally:
+            cursor.close()
+
+        first_day = date.today() - timedelta(days=days // 2)
+
+        def booking_rows():
+            for _ in range(bookings):
+                id_field, price = rng.choice(field_rows)
+                start_hour = rng.randint(6, 21)
+                duration = rng.randint(1, 2)
+                booking_date = first_day + timedelta(days=rng.randrange(days))
+                status = "COMPLETED" if booking_date < date.today() else "UPCOMING"
+                yield (id_field, rng.choice(renter_ids), booking_date,
+                       f"{start_hour:02}:00:00", f"{start_hour + duration:02}:00:00",
+                       price * duration, status)
+
+        _insert_batches(
+            connection,
+            "INSERT INTO booking (id_field, id_users, booking_date, start_time, end_time, "
+            "total_price, status) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            booking_rows(),
+            batch_size)
+    finally:
+        connection.close()
+
+    return {
+        "owners": owners,
+        "renters": renters,
+        "fields": fields,
+        "bookings": bookings,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--owners", type=int, default=50)
+    parser.add_argument("--renters", type=int, default=500)
+    parser.add_argument("--fields", type=int, default=1000)
+    parser.add_argument("--bookings", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=365,
+                        help="Spread bookings over this many days around today")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--reset", action="store_true",
+                        help="Delete a previous benchmark dataset first")
+    args = parser.parse_args()
+
+    if args.reset:
+        connection = get_connection()
+        try:
+            reset(connection)
+        finally:
+            connection.close()
+
+    result = seed(args.owners, args.renters, args.fields, args.bookings,
+                  days=args.days, batch_size=args.batch_size, random_seed=args.seed)
+    print(result)
+
+
+if __name__ == '__main__':
+    main()
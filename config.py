@@ -11,3 +11,40 @@ class Config:
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'supersecretjwtkey')
     JWT_ACCESS_TOKEN_EXPIRES = os.getenv(
         'JWT_ACCESS_TOKEN_EXPIRES', timedelta(seconds=int(3600)))
+    BOOKING_SCHEDULER_ENABLED = os.getenv(
+        'BOOKING_SCHEDULER_ENABLED', 'true').lower() == 'true'
+    BOOKING_SCHEDULER_INTERVAL = int(os.getenv('BOOKING_SCHEDULER_INTERVAL', 60))
+    BOOKING_SCHEDULER_PRELOAD = int(os.getenv('BOOKING_SCHEDULER_PRELOAD', 1000))
+    BOOKING_SCHEDULER_RETRY_DELAY = int(os.getenv('BOOKING_SCHEDULER_RETRY_DELAY', 5))
+    IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', 86400))
+    IDEMPOTENCY_MAX_ENTRIES = int(os.getenv('IDEMPOTENCY_MAX_ENTRIES', 10000))
+    IDEMPOTENCY_WAIT_TIMEOUT = int(os.getenv('IDEMPOTENCY_WAIT_TIMEOUT', 30))
+    IDEMPOTENCY_PERSIST = os.getenv('IDEMPOTENCY_PERSIST', 'false').lower() == 'true'
+    # Klaim tanpa response diambil alih setelah ini, harus > REQUEST_DEADLINE
+    IDEMPOTENCY_LEASE = int(os.getenv('IDEMPOTENCY_LEASE', 60))
+    JOB_QUEUE_WORKERS = int(os.getenv('JOB_QUEUE_WORKERS', 2))
+    JOB_QUEUE_MAX_RETRIES = int(os.getenv('JOB_QUEUE_MAX_RETRIES', 3))
+    JOB_QUEUE_RETRY_DELAY = float(os.getenv('JOB_QUEUE_RETRY_DELAY', 1.0))
+    JOB_QUEUE_SPOOL = os.getenv('JOB_QUEUE_SPOOL', '')
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_INFO_SAMPLE_RATE = float(os.getenv('LOG_INFO_SAMPLE_RATE', 1.0))
+    CACHE_SIZE = int(os.getenv('CACHE_SIZE', 8192))
+    CACHE_TTL = int(os.getenv('CACHE_TTL', 300))
+    # Tanpa CACHE_SHARED_PATH invalidasi hanya sampai ke worker yang menangani
+    # write, jadi TTL harga field dibuat pendek
+    CACHE_TTLS = os.getenv('CACHE_TTLS', 'field_price=15,calendar=60,list_field_read=30')
+    CACHE_SHARED_PATH = os.getenv('CACHE_SHARED_PATH', '')
+    CACHE_SYNC_INTERVAL = float(os.getenv('CACHE_SYNC_INTERVAL', 1.0))
+    # Jumlah limit tidak melebihi POOL_SIZE (default 10), supaya request tidak antre di pool
+    ADMISSION_LIMITS = os.getenv('ADMISSION_LIMITS',
+                                 'auth=2,booking=4,list_field=3,list_field_bulk=1')
+    ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', 0.5))
+    REQUEST_DEADLINE = float(os.getenv('REQUEST_DEADLINE', 10))
+    BOOKING_ARCHIVE_ENABLED = os.getenv('BOOKING_ARCHIVE_ENABLED', 'false').lower() == 'true'
+    BOOKING_ARCHIVE_AFTER_MONTHS = int(os.getenv('BOOKING_ARCHIVE_AFTER_MONTHS', 6))
+    BOOKING_ARCHIVE_BATCH_SIZE = int(os.getenv('BOOKING_ARCHIVE_BATCH_SIZE', 1000))
+    BOOKING_ARCHIVE_INTERVAL = int(os.getenv('BOOKING_ARCHIVE_INTERVAL', 3600))
+    PROFILER_ENABLED = os.getenv('PROFILER_ENABLED', 'false').lower() == 'true'
+    PROFILER_TOKEN = os.getenv('PROFILER_TOKEN', '')
+    PROFILER_MAX_SECONDS = float(os.getenv('PROFILER_MAX_SECONDS', 30))
+    PROFILER_INTERVAL = float(os.getenv('PROFILER_INTERVAL', 0.01))
@@ -1,4 +1,19 @@
 """Add jwt extension"""
 from flask_jwt_extended import JWTManager
 
+from helper.admission import AdmissionController
+from helper.booking_archive import BookingArchiver
+from helper.booking_scheduler import BookingStatusScheduler
+from helper.cache import Cache
+from helper.idempotency import IdempotencyStore
+from helper.job_queue import JobQueue
+from helper.profiler import Profiler
+
 jwt = JWTManager()
+booking_scheduler = BookingStatusScheduler()
+booking_archiver = BookingArchiver()
+idempotency = IdempotencyStore()
+job_queue = JobQueue()
+cache = Cache()
+admission = AdmissionController()
+profiler = Profiler()
@@ -0,0 +1,116 @@
+"""Admission control, request deadlines and load shedding"""
+import logging
+import threading
+import time
+
+from flask import g, has_request_context, jsonify, request
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineExceeded(Exception):
+    """The request ran out of time before it could finish"""
+
+
+def remaining_time():
+    """
+    Seconds left before the current request's deadline.
+
+    Returns:
+        float: Remaining seconds (possibly negative), or None outside a request
+        or when no deadline is set.
+    """
+    if not has_request_context():
+        return None
+    deadline = g.get('deadline')
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def extend_deadline(seconds):
+    """Give the current request at least `seconds` more, for bulk endpoints"""
+    if has_request_context() and g.get('deadline') is not None:
+        g.deadline = max(g.deadline, time.monotonic() + seconds)
+
+
+def parse_limits(value):
+    """Parse `auth=4,booking=8` into `{"auth": 4, "booking": 8}`"""
+    if isinstance(value, dict):
+        return value
+    limits = {}
+    for item in (value or "").split(","):
+        if item.strip():
+            name, limit = item.split("=")
+            limits[name.strip()] = int(limit)
+    return limits
+
+
+class AdmissionController:
+    """
+    Caps concurrent requests per blueprint and sheds the excess.
+
+    A request to a limited blueprint waits at most `ADMISSION_QUEUE_TIMEOUT`
+    seconds for a slot, then gets a 503 with `Retry-After` instead of piling
+    up behind the database or bcrypt. Blueprints without a limit, such as
+    `data_protected` and `static_file_server`, are never queued. Every request
+    also gets a deadline of `REQUEST_DEADLINE` seconds that `get_connection`
+    turns into a query timeout.
+    """
+
+    def __init__(self, app=None):
+        self._semaphores = {}
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        self.queue_timeout = 0.5
+        self.deadline = 10.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read config and register the request hooks"""
+        self.queue_timeout = app.config.get('ADMISSION_QUEUE_TIMEOUT', 0.5)
+        self.deadline = app.config.get('REQUEST_DEADLINE', 10.0)
+        for name, limit in parse_limits(app.config.get('ADMISSION_LIMITS')).items():
+            self._semaphores[name] = threading.BoundedSemaphore(limit)
+            self._stats[name] = {"limit": limit, "admitted": 0, "shed": 0}
+        app.extensions['admission'] = self
+        app.before_request(self._admit)
+        app.teardown_request(self._release)
+        app.register_error_handler(DeadlineExceeded, self._deadline_exceeded)
+
+    def _admit(self):
+        g.deadline = time.monotonic() + self.deadline
+        semaphore = self._semaphores.get(request.blueprint)
+        if semaphore is None:
+            return None
+        if not semaphore.acquire(timeout=self.queue_timeout):
+            self._count(request.blueprint, "shed")
+            logger.warning("Shedding request to %s, no slot within %ss",
+                           request.blueprint, self.queue_timeout)
+            response = jsonify({"message": "Server is busy, please retry shortly"})
+            response.headers['Retry-After'] = '1'
+            return response, 503
+        g.admission_slot = semaphore
+        self._count(request.blueprint, "admitted")
+        return None
+
+    def _release(self, _exc):
+        semaphore = g.pop('admission_slot', None)
+        if semaphore is not None:
+            semaphore.release()
+
+    def _count(self, name, key):
+        with self._stats_lock:
+            self._stats[name][key] += 1
+
+    @staticmethod
+    def _deadline_exceeded(error):
+        response = jsonify({"message": "Request deadline exceeded", "error": str(error)})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+
+    def stats(self):
+        """Admitted/shed counters per blueprint for the metrics endpoint"""
+        with self._stats_lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
@@ -0,0 +1,20 @@
+"""Audit log of writes, recorded by the job queue after the commit"""
+import logging
+
+from extensions import job_queue
+
+audit_logger = logging.getLogger('audit')
+
+
+@job_queue.task
+def audit_log(action, table, row_id, id_users=None):
+    """
+    Record a committed write.
+
+    Args:
+        action (str): `create`, `update` or `delete`.
+        table (str): Table that was written.
+        row_id (int): Primary key of the written row.
+        id_users (int): User that made the change, if known.
+    """
+    audit_logger.info("%s %s id=%s by id_users=%s", action, table, row_id, id_users)
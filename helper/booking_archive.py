@@ -0,0 +1,166 @@
+"""
+Background job that moves old completed bookings into booking_archive.
+
+Usage:
+    python -m helper.booking_archive              # archive once and exit
+    python -m helper.booking_archive --months 12
+"""
+import argparse
+import calendar
+import logging
+import threading
+import time
+from datetime import date, datetime
+
+from helper.db_helper import get_connection
+from helper.query_registry import register_query
+
+logger = logging.getLogger(__name__)
+
+# Named MySQL lock, so only one worker archives at a time
+LOCK_NAME = "booking_archiver"
+
+# Oldest first, walks idx_booking_status_date
+ARCHIVE_CANDIDATES_QUERY = register_query("booking_archive.candidates", """
+SELECT id_booking
+FROM booking
+WHERE status = 'COMPLETED' AND booking_date < %s
+ORDER BY booking_date
+LIMIT %s
+""", ("2024-01-01", 1000))
+
+
+def months_ago(today, months):
+    """`today` shifted back by whole months, clamped to the end of shorter months"""
+    year, month = divmod(today.year * 12 + today.month - 1 - months, 12)
+    month += 1
+    return date(year, month, min(today.day, calendar.monthrange(year, month)[1]))
+
+
+class BookingArchiver:
+    """
+    Moves COMPLETED bookings older than `BOOKING_ARCHIVE_AFTER_MONTHS` from
+    `booking` into the partitioned `booking_archive` table.
+
+    Rows are copied and deleted in batches of `BOOKING_ARCHIVE_BATCH_SIZE`,
+    one transaction per batch, so the hot table and its indexes stay small
+    without long locks. Runs every `BOOKING_ARCHIVE_INTERVAL` seconds when
+    `BOOKING_ARCHIVE_ENABLED` is set; apply migration 0003 first.
+    """
+
+    def __init__(self, app=None):
+        self._stop = threading.Event()
+        self._thread = None
+        self.after_months = 6
+        self.batch_size = 1000
+        self.interval = 3600
+        self.pause = 0.1
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read config and start the worker thread if enabled"""
+        self.after_months = app.config.get('BOOKING_ARCHIVE_AFTER_MONTHS', 6)
+        self.batch_size = app.config.get('BOOKING_ARCHIVE_BATCH_SIZE', 1000)
+        self.interval = app.config.get('BOOKING_ARCHIVE_INTERVAL', 3600)
+        app.extensions['booking_archiver'] = self
+        if app.config.get('BOOKING_ARCHIVE_ENABLED', False):
+            self.start()
+
+    def start(self):
+        """Start the daemon worker thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="booking-archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Ask the worker thread to exit after the current batch"""
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
+
+    def run_once(self, today=None):
+        """
+        Archive every eligible booking, if this worker holds the lock.
+
+        Returns:
+            int: Number of bookings archived, or None if another worker holds
+            the lock or the run failed.
+        """
+        cutoff = months_ago(today or date.today(), self.after_months)
+        connection = None
+        cursor = None
+        try:
+            connection = get_connection()
+            cursor = connection.cursor()
+            cursor.execute("SELECT GET_LOCK(%s, 0)", (LOCK_NAME,))
+            (acquired,) = cursor.fetchone()
+            if not acquired:
+                return None
+            try:
+                archived = 0
+                while not self._stop.is_set():
+                    moved = self._archive_batch(connection, cursor, cutoff)
+                    archived += moved
+                    if moved < self.batch_size:
+                        break
+                    time.sleep(self.pause)
+            finally:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+                cursor.fetchone()
+            if archived:
+                logger.info("Archived %s bookings completed before %s", archived, cutoff)
+            return archived
+        except Exception as e:
+            logger.error("Error archiving bookings: %s", e)
+            return None
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                connection.close()
+
+    def _archive_batch(self, connection, cursor, cutoff):
+        """Copy one batch into booking_archive and delete it, in one transaction"""
+        connection.start_transaction()
+        try:
+            cursor.execute(ARCHIVE_CANDIDATES_QUERY, (cutoff, self.batch_size))
+            ids = [row[0] for row in cursor.fetchall()]
+            if ids:
+                placeholders = ", ".join(["%s"] * len(ids))
+                cursor.execute(
+                    f"INSERT INTO booking_archive SELECT b.*, %s FROM booking b "
+                    f"WHERE b.id_booking IN ({placeholders})", (datetime.now(), *ids))
+                cursor.execute(
+                    f"DELETE FROM booking WHERE id_booking IN ({placeholders})", ids)
+            connection.commit()
+            return len(ids)
+        except Exception:
+            connection.rollback()
+            raise
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Archive old completed bookings once")
+    parser.add_argument("--months", type=int, default=6,
+                        help="Archive bookings completed more than this many months ago")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    archiver = BookingArchiver()
+    archiver.after_months = args.months
+    archiver.batch_size = args.batch_size
+    archived = archiver.run_once()
+    if archived is None:
+        raise SystemExit("Archiving failed or another worker holds the lock")
+    print(f"Archived {archived} bookings")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+"""Background scheduler that moves bookings through their status lifecycle"""
+import heapq
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from helper.db_helper import get_dedicated_connection
+from helper.query_registry import register_query
+
+logger = logging.getLogger(__name__)
+
+STATUS_UPCOMING = "UPCOMING"
+STATUS_ONGOING = "ONGOING"
+STATUS_COMPLETED = "COMPLETED"
+
+# Named MySQL lock, shared by every worker process pointing at the same database
+LOCK_NAME = "booking_status_scheduler"
+
+# Set-based transitions, executed once per tick regardless of how many rows are due.
+# The plain booking_date bounds let idx_booking_status_date narrow the range.
+START_DUE_QUERY = register_query("booking_scheduler.start_due", """
+UPDATE booking
+SET status = 'ONGOING'
+WHERE status = 'UPCOMING'
+  AND booking_date <= %s
+  AND TIMESTAMP(booking_date, start_time) <= %s
+  AND TIMESTAMP(booking_date, end_time) > %s
+""", ("2024-01-01", "2024-01-01 08:00:00", "2024-01-01 08:00:00"))
+END_DUE_QUERY = register_query("booking_scheduler.end_due", """
+UPDATE booking
+SET status = 'COMPLETED'
+WHERE status IN ('UPCOMING', 'ONGOING')
+  AND booking_date <= %s
+  AND TIMESTAMP(booking_date, end_time) <= %s
+""", ("2024-01-01", "2024-01-01 08:00:00"))
+NEXT_TRANSITIONS_QUERY = register_query("booking_scheduler.next_transitions", """
+SELECT TIMESTAMP(booking_date, start_time) AS start_at,
+       TIMESTAMP(booking_date, end_time) AS end_at
+FROM booking
+WHERE status IN ('UPCOMING', 'ONGOING')
+  AND booking_date >= %s
+  AND TIMESTAMP(booking_date, end_time) > %s
+ORDER BY booking_date, start_time
+LIMIT %s
+""", ("2024-01-01", "2024-01-01 08:00:00", 1000))
+
+
+def compute_status(booking_date, start_time, end_time, now=None):
+    """
+    Status of a booking at `now`, used when a booking is written.
+
+    Args:
+        booking_date (date): Date, or a string in `%Y-%m-%d` format.
+        start_time (str): Start time in `%H:%M:%S` format.
+        end_time (str): End time in `%H:%M:%S` format.
+        now (datetime): Reference time, defaults to `datetime.now()`.
+
+    Returns:
+        str: One of UPCOMING, ONGOING or COMPLETED.
+    """
+    now = now or datetime.now()
+    start_at = datetime.strptime(f"{booking_date} {start_time}", "%Y-%m-%d %H:%M:%S")
+    end_at = datetime.strptime(f"{booking_date} {end_time}", "%Y-%m-%d %H:%M:%S")
+    if now < start_at:
+        return STATUS_UPCOMING
+    if now < end_at:
+        return STATUS_ONGOING
+    return STATUS_COMPLETED
+
+
+class BookingStatusScheduler:
+    """
+    Keeps `booking.status` in sync with the clock.
+
+    One worker process runs the scheduler: it takes a MySQL named lock on a
+    dedicated connection and holds it for as long as the process lives. The
+    other workers retry taking the lock every `retry_delay` seconds, so one
+    of them takes over when the holder exits.
+
+    The holder keeps upcoming transition times in a min-heap, so it sleeps
+    until the next booking starts or ends instead of polling the table. When a
+    transition is due, all due rows are moved with two set-based UPDATEs. The
+    heap is refreshed from the database every `poll_interval` seconds to pick
+    up bookings written by other workers. A failed tick is retried after
+    `retry_delay` seconds.
+    """
+
+    def __init__(self, app=None):
+        self._heap = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self._lock_connection = None
+        self.poll_interval = 60
+        self.preload_limit = 1000
+        self.retry_delay = 5
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read config and start the worker thread if enabled"""
+        self.poll_interval = app.config.get('BOOKING_SCHEDULER_INTERVAL', 60)
+        self.preload_limit = app.config.get('BOOKING_SCHEDULER_PRELOAD', 1000)
+        self.retry_delay = app.config.get('BOOKING_SCHEDULER_RETRY_DELAY', 5)
+        app.extensions['booking_scheduler'] = self
+        if app.config.get('BOOKING_SCHEDULER_ENABLED', True):
+            self.start()
+
+    def start(self):
+        """Start the daemon worker thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped = False
+        self._thread = threading.Thread(
+            target=self._run, name="booking-status-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Ask the worker thread to exit after the current tick and release the lock"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def schedule(self, *transitions):
+        """Add the transition times of a freshly written booking to the heap"""
+        with self._condition:
+            # Worker lain mengambilnya saat refresh berikutnya
+            if self._lock_connection is None:
+                return
+            for when in transitions:
+                heapq.heappush(self._heap, when)
+            self._condition.notify()
+
+    def _run(self):
+        next_refresh = datetime.min
+        try:
+            while True:
+                with self._condition:
+                    if self._stopped:
+                        return
+                if not self._hold_lock():
+                    # Refresh segera setelah lock berhasil diambil
+                    next_refresh = datetime.min
+                    with self._condition:
+                        if not self._stopped:
+                            self._condition.wait(self.retry_delay)
+                    continue
+
+                now = datetime.now()
+                if now >= next_refresh:
+                    self._refresh(now)
+                    next_refresh = now + timedelta(seconds=self.poll_interval)
+
+                with self._condition:
+                    if self._stopped:
+                        return
+                    due = False
+                    while self._heap and self._heap[0] <= now:
+                        heapq.heappop(self._heap)
+                        due = True
+                    if not due:
+                        wake_at = next_refresh
+                        if self._heap:
+                            wake_at = min(wake_at, self._heap[0])
+                        timeout = max((wake_at - now).total_seconds(), 0)
+                        self._condition.wait(timeout)
+                        continue
+
+                if self.tick(now) is None:
+                    # Transisi yang sudah di-pop belum dijalankan, coba lagi sebentar lagi
+                    self.schedule(now + timedelta(seconds=self.retry_delay))
+        finally:
+            self._release_lock()
+
+    def _hold_lock(self):
+        """True if this process holds the scheduler lock, taking it when it is free"""
+        connection = self._lock_connection
+        if connection is not None:
+            try:
+                if _fetch_value(connection, "SELECT IS_USED_LOCK(%s) = CONNECTION_ID()",
+                                (LOCK_NAME,)):
+                    return True
+            except Exception as e:
+                logger.error("Error checking the booking scheduler lock: %s", e)
+            logger.warning("Lost the booking scheduler lock")
+            self._release_lock()
+
+        try:
+            connection = get_dedicated_connection()
+        except Exception as e:
+            logger.error("Error connecting for the booking scheduler lock: %s", e)
+            return False
+        try:
+            acquired = _fetch_value(connection, "SELECT GET_LOCK(%s, 0)", (LOCK_NAME,))
+        except Exception as e:
+            logger.error("Error taking the booking scheduler lock: %s", e)
+            acquired = False
+        if not acquired:
+            _close_quietly(connection)
+            return False
+        with self._condition:
+            self._lock_connection = connection
+        logger.info("This worker now runs the booking status scheduler")
+        return True
+
+    def _release_lock(self):
+        """Close the lock connection, MySQL releases the lock with it"""
+        with self._condition:
+            connection, self._lock_connection = self._lock_connection, None
+            self._heap = []
+        if connection is not None:
+            _close_quietly(connection)
+
+    def _refresh(self, now):
+        """Tick once and reload the nearest transitions from the database"""
+        self.tick(now)
+        connection = self._lock_connection
+        if connection is None:
+            return
+        cursor = None
+        try:
+            cursor = connection.cursor()
+            cursor.execute(NEXT_TRANSITIONS_QUERY, (now.date(), now, self.preload_limit))
+            heap = []
+            for start_at, end_at in cursor.fetchall():
+                if start_at and start_at > now:
+                    heap.append(start_at)
+                if end_at:
+                    heap.append(end_at)
+            heapq.heapify(heap)
+            with self._condition:
+                self._heap = heap
+        except Exception as e:
+            logger.error("Error loading booking transitions: %s", e)
+        finally:
+            if cursor:
+                cursor.close()
+
+    def tick(self, now=None):
+        """
+        Apply every due transition, if this worker holds the scheduler lock.
+
+        Returns:
+            tuple: Number of rows moved to ONGOING and COMPLETED, or None if
+            this worker does not hold the lock or the UPDATEs failed.
+        """
+        now = now or datetime.now()
+        connection = self._lock_connection
+        if connection is None:
+            return None
+        cursor = None
+        try:
+            cursor = connection.cursor()
+            cursor.execute(END_DUE_QUERY, (now.date(), now))
+            completed = cursor.rowcount
+            cursor.execute(START_DUE_QUERY, (now.date(), now, now))
+            started = cursor.rowcount
+            connection.commit()
+            if started or completed:
+                logger.info("Booking status tick: %s ongoing, %s completed",
+                            started, completed)
+            return started, completed
+        except Exception as e:
+            logger.error("Error updating booking statuses: %s", e)
+            try:
+                connection.rollback()
+            except Exception:
+                pass
+            return None
+        finally:
+            if cursor:
+                cursor.close()
+
+
+def _fetch_value(connection, query, params):
+    """First column of the first row of `query`"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(query, params)
+        (value,) = cursor.fetchone()
+        return value
+    finally:
+        cursor.close()
+
+
+def _close_quietly(connection):
+    try:
+        connection.close()
+    except Exception as e:
+        logger.warning("Error closing the booking scheduler connection: %s", e)
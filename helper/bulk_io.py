@@ -0,0 +1,80 @@
+"""Streaming CSV/NDJSON readers and writers for bulk import and export"""
+import csv
+import io
+import json
+
+FORMATS = ('csv', 'ndjson')
+MIMETYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+
+def detect_format(requested, filename):
+    """
+    Pick the bulk format from `?format=` or the uploaded file name.
+
+    Returns:
+        str: `csv` or `ndjson`.
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    if requested:
+        if requested not in FORMATS:
+            raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+        return requested
+    name = (filename or '').lower()
+    if name.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    if name.endswith('.csv'):
+        return 'csv'
+    raise ValueError("Cannot tell the file format, pass ?format=csv or ?format=ndjson")
+
+
+def iter_rows(stream, fmt):
+    """
+    Yield `(line_number, row_dict)` from a binary stream, one row at a time.
+
+    A line that cannot be decoded yields `(line_number, ValueError)` so the
+    caller can report it and carry on. The csv reader resumes after the bad
+    line, for example one over `csv.field_size_limit()`.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                # line_num belum maju untuk baris yang gagal
+                yield reader.line_num + 1, ValueError(f"Invalid CSV: {e}")
+                continue
+            yield reader.line_num, row
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f"Invalid JSON: {e}")
+            continue
+        if not isinstance(row, dict):
+            yield line_number, ValueError("Each line must be a JSON object")
+            continue
+        yield line_number, row
+
+
+def iter_encoded(fmt, columns, rows):
+    """Yield the export body chunk by chunk, one chunk per batch of rows"""
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for batch in rows:
+            writer.writerows(batch)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        return
+    for batch in rows:
+        yield ''.join(json.dumps(dict(zip(columns, row)), default=str) + '\n' for row in batch)
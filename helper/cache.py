@@ -0,0 +1,454 @@
+"""Two-tier cache shared by the blueprints: in-process LRU plus a shared SQLite file"""
+import functools
+import inspect
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import make_response, request
+
+from helper.admission import parse_limits
+
+logger = logging.getLogger(__name__)
+
+CREATE_SHARED_QUERIES = (
+    """
+    CREATE TABLE IF NOT EXISTS entries (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        expires_at REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS entry_tags (
+        tag TEXT NOT NULL,
+        key TEXT NOT NULL,
+        PRIMARY KEY (tag, key)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS invalidations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tag TEXT,
+        key TEXT,
+        at REAL NOT NULL
+    )
+    """,
+)
+
+# Invalidation log rows older than this are pruned, a worker that has not
+# synced for that long has expired its local entries anyway
+INVALIDATION_RETENTION = 3600
+
+
+class _Flight:
+    """One in-progress load that concurrent callers of the same key wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class Cache:
+    """
+    In-process LRU tier in front of an optional shared SQLite tier.
+
+    - `get`/`set`/`delete` work on string keys; the part before the first `:`
+      is the namespace (`field_price:12`). Statistics are grouped by it and
+      `CACHE_TTLS` sets a TTL per namespace, `CACHE_TTL` for the rest.
+    - `get_or_set` coalesces concurrent misses of one key into a single load.
+    - Entries carry tags such as `field:12` or `user:3`, and
+      `invalidate_tags` drops every entry with one of them.
+    - `memoize` and `cached_view` wrap functions and Flask views.
+
+    With `CACHE_SHARED_PATH` set, every worker process on the host shares one
+    SQLite file: values written by one worker are read by the others, and
+    invalidations are logged there and replayed into each worker's LRU tier
+    within `CACHE_SYNC_INTERVAL` seconds. Values are pickled, so keep the
+    file private to the app. `None` is never cached.
+    """
+
+    def __init__(self, app=None):
+        self._entries = OrderedDict()
+        self._tag_keys = {}
+        self._tag_versions = {}
+        self._versions_epoch = 0
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self._shared = None
+        self._shared_lock = threading.Lock()
+        self._last_invalidation = 0
+        self._next_sync = 0.0
+        self._stats = {}
+        self.max_entries = 8192
+        self.ttl = 300
+        self.ttls = {}
+        self.sync_interval = 1.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read config and open the shared tier"""
+        self.max_entries = app.config.get('CACHE_SIZE', 8192)
+        self.ttl = app.config.get('CACHE_TTL', 300)
+        self.ttls = parse_limits(app.config.get('CACHE_TTLS'))
+        self.sync_interval = app.config.get('CACHE_SYNC_INTERVAL', 1.0)
+        app.extensions['cache'] = self
+
+        shared_path = app.config.get('CACHE_SHARED_PATH')
+        if shared_path:
+            self._shared = sqlite3.connect(shared_path, timeout=5, check_same_thread=False)
+            self._shared.execute("PRAGMA journal_mode=WAL")
+            self._shared.execute("PRAGMA synchronous=NORMAL")
+            for query in CREATE_SHARED_QUERIES:
+                self._shared.execute(query)
+            self._shared.commit()
+            (last,) = self._shared.execute("SELECT COALESCE(MAX(id), 0) FROM invalidations").fetchone()
+            self._last_invalidation = last
+
+    # -- public API ---------------------------------------------------------
+
+    def get(self, key, default=None):
+        """Cached value of `key`, or `default` on a miss"""
+        started = time.perf_counter()
+        self._sync()
+        value = self._get_local(key)
+        tier = "local"
+        if value is None:
+            value = self._get_shared(key)
+            tier = "shared"
+        self._record(key, "miss" if value is None else tier, time.perf_counter() - started)
+        return default if value is None else value
+
+    def set(self, key, value, ttl=None, tags=(), versions=None):
+        """
+        Store `value` under `key` in both tiers.
+
+        Pass `versions` from `tag_versions(tags)`, taken before the value was
+        read from the database, to skip the write when one of the tags was
+        invalidated in the meantime; the value may predate that write.
+        """
+        if value is None:
+            return
+        if ttl is None:
+            ttl = self.ttls.get(key.split(":", 1)[0], self.ttl)
+        tags = tuple(tags)
+        if self._set_local(key, value, ttl, tags, versions):
+            self._set_shared(key, value, ttl, tags)
+
+    def tag_versions(self, tags):
+        """Invalidation counters of `tags`, for `set(..., versions=)`"""
+        with self._lock:
+            return (self._versions_epoch,
+                    tuple(self._tag_versions.get(tag, 0) for tag in tags))
+
+    def delete(self, key):
+        """Drop one key from every worker"""
+        self._drop_local(keys=(key,))
+        self._invalidate_shared(keys=(key,))
+
+    def invalidate_tags(self, *tags):
+        """Drop every entry tagged with one of `tags`, in every worker"""
+        if not tags:
+            return
+        self._drop_local(tags=tags)
+        self._invalidate_shared(tags=tags)
+
+    def get_or_set(self, key, loader, ttl=None, tags=()):
+        """
+        Cached value of `key`, loading it with `loader()` on a miss.
+
+        Concurrent misses of the same key in this worker wait for the first
+        caller's load instead of all hitting the database. If the load
+        fails, every waiting caller gets the same exception.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            self._record(key, "coalesced")
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        tags = tuple(tags)
+        versions = self.tag_versions(tags)
+        started = time.perf_counter()
+        try:
+            flight.value = loader()
+            self.set(key, flight.value, ttl, tags, versions)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            self._record(key, "load", time.perf_counter() - started)
+            with self._flights_lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def memoize(self, key, ttl=None, tags=()):
+        """
+        Cache a function's result with `get_or_set`.
+
+        `key` and each tag are format strings filled in with the function's
+        arguments by name, e.g. `memoize("field_price:{id_field}",
+        tags=("field:{id_field}",))`, or callables taking the same arguments.
+        """
+        def decorator(func):
+            signature = inspect.signature(func)
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                arguments = bound.arguments
+                return self.get_or_set(
+                    _render(key, arguments),
+                    lambda: func(*args, **kwargs),
+                    ttl,
+                    [_render(tag, arguments) for tag in tags])
+            return wrapper
+        return decorator
+
+    def cached_view(self, key, ttl=None, tags=None):
+        """
+        Cache the body of a view's 200 responses.
+
+        `key` and `tags` are callables taking the view arguments, so they can
+        read the JWT identity. The request path, query string and Accept
+        header are always part of the key, since they pick the response format.
+        """
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                cache_key = (f"{key(*args, **kwargs)}:{request.full_path}"
+                             f":{request.headers.get('Accept', '')}")
+
+                def render():
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or response.is_streamed:
+                        raise _Uncacheable(response)
+                    return response.get_data(), response.mimetype
+
+                try:
+                    body, mimetype = self.get_or_set(
+                        cache_key, render, ttl, tags(*args, **kwargs) if tags else ())
+                except _Uncacheable as uncacheable:
+                    # A coalesced caller renders its own copy of the error
+                    if uncacheable.thread != threading.get_ident():
+                        return view(*args, **kwargs)
+                    return uncacheable.response
+                response = make_response(body, 200)
+                response.mimetype = mimetype
+                return response
+            return wrapper
+        return decorator
+
+    def stats(self):
+        """Per-namespace hit/miss counters and latencies for the metrics endpoint"""
+        with self._lock:
+            size = len(self._entries)
+            namespaces = {name: dict(stats) for name, stats in self._stats.items()}
+        for stats in namespaces.values():
+            hits = stats["local_hits"] + stats["shared_hits"]
+            lookups = hits + stats["misses"]
+            lookup_seconds = stats.pop("lookup_seconds")
+            load_seconds = stats.pop("load_seconds")
+            stats["hit_rate"] = round(hits / lookups, 4) if lookups else None
+            stats["avg_lookup_ms"] = round(lookup_seconds * 1000 / lookups, 3) if lookups else None
+            stats["avg_load_ms"] = (round(load_seconds * 1000 / stats["loads"], 3)
+                                    if stats["loads"] else None)
+        return {"size": size, "max_entries": self.max_entries,
+                "shared": self._shared is not None, "namespaces": namespaces}
+
+    # -- local tier ---------------------------------------------------------
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def _set_local(self, key, value, ttl, tags, versions=None):
+        """Store locally, False if a tag changed since `versions` was taken"""
+        with self._lock:
+            if versions is not None and versions != (
+                    self._versions_epoch,
+                    tuple(self._tag_versions.get(tag, 0) for tag in tags)):
+                return False
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, value, tags)
+            for tag in tags:
+                self._tag_keys.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                evicted = next(iter(self._entries))
+                self._remove(evicted)
+                self._record_locked(evicted, "evictions")
+        return True
+
+    def _drop_local(self, tags=(), keys=()):
+        with self._lock:
+            # Counters are only compared, never read back; forget them all at
+            # once, the new epoch makes older snapshots stale
+            if len(self._tag_versions) > self.max_entries * 4:
+                self._tag_versions.clear()
+                self._versions_epoch += 1
+            for tag in tags:
+                self._tag_versions[tag] = self._tag_versions.get(tag, 0) + 1
+                for key in self._tag_keys.pop(tag, ()):
+                    self._remove(key)
+            for key in keys:
+                self._remove(key)
+
+    def _remove(self, key):
+        """Drop a local entry and its tag index, with the lock held"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tag_keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_keys[tag]
+
+    # -- shared tier --------------------------------------------------------
+
+    def _get_shared(self, key):
+        if self._shared is None:
+            return None
+        try:
+            with self._shared_lock:
+                row = self._shared.execute(
+                    "SELECT value, expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                tags = [tag for (tag,) in self._shared.execute(
+                    "SELECT tag FROM entry_tags WHERE key = ?", (key,))]
+        except sqlite3.Error as e:
+            logger.warning("Shared cache read failed for %s: %s", key, e)
+            return None
+        remaining = row[1] - time.time()
+        if remaining <= 0:
+            return None
+        value = pickle.loads(row[0])
+        self._set_local(key, value, remaining, tuple(tags))
+        return value
+
+    def _set_shared(self, key, value, ttl, tags):
+        if self._shared is None:
+            return
+        try:
+            payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            now = time.time()
+            with self._shared_lock, self._shared:
+                self._shared.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, payload, now + ttl))
+                self._shared.execute("DELETE FROM entry_tags WHERE key = ?", (key,))
+                self._shared.executemany(
+                    "INSERT OR IGNORE INTO entry_tags (tag, key) VALUES (?, ?)",
+                    [(tag, key) for tag in tags])
+        except (sqlite3.Error, pickle.PicklingError) as e:
+            logger.warning("Shared cache write failed for %s: %s", key, e)
+
+    def _invalidate_shared(self, tags=(), keys=()):
+        if self._shared is None:
+            return
+        now = time.time()
+        try:
+            with self._shared_lock, self._shared:
+                for tag in tags:
+                    self._shared.execute(
+                        "DELETE FROM entries WHERE key IN "
+                        "(SELECT key FROM entry_tags WHERE tag = ?)", (tag,))
+                    self._shared.execute("DELETE FROM entry_tags WHERE tag = ?", (tag,))
+                for key in keys:
+                    self._shared.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self._shared.execute("DELETE FROM entry_tags WHERE key = ?", (key,))
+                self._shared.executemany(
+                    "INSERT INTO invalidations (tag, key, at) VALUES (?, ?, ?)",
+                    [(tag, None, now) for tag in tags] + [(None, key, now) for key in keys])
+                self._shared.execute("DELETE FROM invalidations WHERE at < ?",
+                                     (now - INVALIDATION_RETENTION,))
+                self._shared.execute("DELETE FROM entries WHERE expires_at < ?", (now,))
+        except sqlite3.Error as e:
+            logger.warning("Shared cache invalidation failed: %s", e)
+
+    def _sync(self):
+        """Replay invalidations logged by other workers into the local tier"""
+        if self._shared is None or time.monotonic() < self._next_sync:
+            return
+        if not self._shared_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_sync = time.monotonic() + self.sync_interval
+            rows = self._shared.execute(
+                "SELECT id, tag, key FROM invalidations WHERE id > ? ORDER BY id",
+                (self._last_invalidation,)).fetchall()
+        except sqlite3.Error as e:
+            logger.warning("Shared cache sync failed: %s", e)
+            return
+        finally:
+            self._shared_lock.release()
+        if rows:
+            self._last_invalidation = rows[-1][0]
+            self._drop_local(tags={tag for _, tag, _ in rows if tag},
+                             keys={key for _, _, key in rows if key})
+
+    # -- statistics ---------------------------------------------------------
+
+    def _record(self, key, event, seconds=0.0):
+        with self._lock:
+            self._record_locked(key, event, seconds)
+
+    def _record_locked(self, key, event, seconds=0.0):
+        namespace = key.split(":", 1)[0]
+        stats = self._stats.get(namespace)
+        if stats is None:
+            stats = self._stats[namespace] = {
+                "local_hits": 0, "shared_hits": 0, "misses": 0, "loads": 0,
+                "coalesced": 0, "evictions": 0, "lookup_seconds": 0.0, "load_seconds": 0.0}
+        if event in ("local", "shared", "miss"):
+            stats["local_hits" if event == "local" else
+                  "shared_hits" if event == "shared" else "misses"] += 1
+            stats["lookup_seconds"] += seconds
+        elif event == "load":
+            stats["loads"] += 1
+            stats["load_seconds"] += seconds
+        else:
+            stats[event] += 1
+
+
+class _Uncacheable(Exception):
+    """Carries a response `cached_view` must return without caching"""
+
+    def __init__(self, response):
+        super().__init__("Response is not cacheable")
+        self.response = response
+        self.thread = threading.get_ident()
+
+
+def _render(template, arguments):
+    """Fill a key or tag template from the wrapped function's arguments"""
+    if callable(template):
+        return template(**arguments)
+    return template.format(**arguments)
@@ -0,0 +1,87 @@
+"""Occupancy grid for the booking calendar, cached per (field, week)"""
+import re
+from datetime import date, datetime, timedelta
+
+MINUTES_PER_DAY = 24 * 60
+SLOT_PATTERN = re.compile(r"^(\d+)(m|h)$")
+
+
+def parse_slot(value):
+    """
+    Parse a slot length such as `30m` or `1h`.
+
+    Returns:
+        int: Slot length in minutes.
+
+    Raises:
+        ValueError: If the value is malformed or does not divide a day evenly.
+    """
+    match = SLOT_PATTERN.match(value or "")
+    if not match:
+        raise ValueError("slot must look like 30m or 1h")
+    minutes = int(match.group(1)) * (60 if match.group(2) == "h" else 1)
+    if minutes < 5 or MINUTES_PER_DAY % minutes:
+        raise ValueError("slot must be at least 5 minutes and divide 24h evenly")
+    return minutes
+
+
+def week_start(day):
+    """Monday of the ISO week containing `day`"""
+    return day - timedelta(days=day.weekday())
+
+
+def to_minutes(value):
+    """Minutes since midnight of a TIME column value (timedelta) or HH:MM:SS string"""
+    if isinstance(value, timedelta):
+        return int(value.total_seconds()) // 60
+    hours, minutes = str(value).split(":")[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+def build_grid(intervals, date_from, date_to, slot):
+    """
+    Occupancy bitmap per day.
+
+    Args:
+        intervals (iterable): `(booking_date, start_minute, end_minute)` tuples.
+        date_from (date): First day, inclusive.
+        date_to (date): Last day, inclusive.
+        slot (int): Slot length in minutes.
+
+    Returns:
+        dict: `{"YYYY-MM-DD": "0011..."}`, one character per slot, `1` when any
+        booking overlaps the slot.
+    """
+    slots_per_day = MINUTES_PER_DAY // slot
+    days = {}
+    day = date_from
+    while day <= date_to:
+        days[day] = bytearray(b"0" * slots_per_day)
+        day += timedelta(days=1)
+    for booking_date, start_minute, end_minute in intervals:
+        bits = days.get(booking_date)
+        if bits is None or end_minute <= start_minute:
+            continue
+        first = start_minute // slot
+        last = min(-(-end_minute // slot), slots_per_day)
+        bits[first:last] = b"1" * (last - first)
+    return {day.isoformat(): bits.decode() for day, bits in days.items()}
+
+
+def calendar_key(id_field, booking_date):
+    """
+    Cache key of the week containing `booking_date`, also used as the tag
+    that booking writes invalidate.
+
+    Args:
+        id_field: Field id.
+        booking_date: A date, datetime or YYYY-MM-DD string.
+
+    Returns:
+        str: `calendar:<id_field>:<monday>`.
+    """
+    if isinstance(booking_date, str):
+        booking_date = date.fromisoformat(booking_date)
+    elif isinstance(booking_date, datetime):
+        booking_date = booking_date.date()
+    return f"calendar:{id_field}:{week_start(booking_date).isoformat()}"
@@ -1,7 +1,18 @@
 """DB Helper"""
+import functools
+import logging
 import os
+import time
+
+from flask import g, make_response
+from mysql.connector import connect
+from mysql.connector.errors import PoolError
 from mysql.connector.pooling import MySQLConnectionPool
 
+from helper.admission import DeadlineExceeded, remaining_time
+
+logger = logging.getLogger(__name__)
+
 # Membaca konfigurasi dari environment variables
 DB_HOST = os.environ.get('DB_HOST', 'localhost')
 DB_NAME = os.environ.get('DB_NAME', 'rent_field')
@@ -9,6 +20,7 @@ DB_USER = os.environ.get('DB_USER', 'root')
 DB_PASSWORD = os.environ.get('DB_PASSWORD', '')
 DB_POOLNAME = os.environ.get('DB_POOLNAME', 'default_pool')
 POOL_SIZE = int(os.environ.get('POOL_SIZE', 10))
+DB_AUTOCOMMIT = os.environ.get('DB_AUTOCOMMIT', 'true').lower() == 'true'
 
 # Membuat koneksi pool
 db_pool = MySQLConnectionPool(
@@ -23,7 +35,168 @@ db_pool = MySQLConnectionPool(
 def get_connection():
     """
     Mendapatkan koneksi dari pool
+
+    Inside a request the connection inherits the request deadline: waiting
+    for a free pooled connection stops at the deadline, and SELECTs get a
+    MAX_EXECUTION_TIME of the time that is left.
+    """
+    remaining = remaining_time()
+    while True:
+        try:
+            connection = db_pool.get_connection()
+            break
+        except PoolError:
+            if remaining is None:
+                raise
+            remaining = remaining_time()
+            if remaining <= 0:
+                raise DeadlineExceeded("No database connection available before the deadline")
+            time.sleep(min(0.01, remaining))
+    connection.autocommit = DB_AUTOCOMMIT
+
+    if remaining is not None:
+        remaining = remaining_time()
+        if remaining <= 0:
+            connection.close()
+            raise DeadlineExceeded("Request deadline passed before the query started")
+        cursor = connection.cursor()
+        try:
+            # 0 berarti tanpa batas di MySQL, jadi minimal 1 ms
+            cursor.execute("SET SESSION MAX_EXECUTION_TIME = %s",
+                           (max(1, int(remaining * 1000)),))
+        finally:
+            cursor.close()
+    return connection
+
+
+def get_dedicated_connection():
+    """
+    Connection outside the pool, for background workers that keep it open
+    for the life of the process, such as the booking scheduler's named lock.
+    Always autocommit, so its reads never hold on to an old snapshot.
+    """
+    return connect(host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_NAME,
+                   autocommit=True)
+
+
+def init_app(app):
+    """Release the request-scoped connection at the end of every request"""
+    app.teardown_request(release_db)
+
+
+def get_db():
+    """
+    Request-scoped connection, checked out from the pool on first use and
+    released by `release_db` when the request ends. Inside a `@transactional`
+    view the transaction starts here, on first use.
+    """
+    if 'db' not in g:
+        g.db = get_connection()
+    if g.get('db_transactional') and not g.db.in_transaction:
+        g.db.start_transaction()
+    return g.db
+
+
+def get_cursor(dictionary=False, **kwargs):
+    """Cursor on the request-scoped connection, closed with the connection"""
+    cursor = get_db().cursor(dictionary=dictionary, **kwargs)
+    g.setdefault('db_cursors', []).append(cursor)
+    return cursor
+
+
+def release_db(_exc=None, discard=False):
+    """
+    Return the request-scoped connection to the pool. Never raises.
+
+    Runs on teardown; handlers may call it earlier to free the connection
+    before slow work that does not need the database, such as bcrypt.
+    Pass `discard=True` when a result set may be left unread, for example an
+    export the client abandoned: the connection is disconnected before it
+    goes back, and the pool reconnects it on the next checkout.
+    """
+    connection = g.pop('db', None)
+    if discard and connection is not None:
+        try:
+            connection.disconnect()
+        except Exception as e:
+            logger.warning("Error disconnecting: %s", e)
+    for cursor in g.pop('db_cursors', []):
+        try:
+            cursor.close()
+        except Exception as e:
+            if not discard:
+                logger.warning("Error closing cursor: %s", e)
+    if connection is None:
+        return
+    try:
+        if not discard and connection.in_transaction:
+            connection.rollback()
+    except Exception as e:
+        logger.warning("Error rolling back: %s", e)
+    try:
+        # Pool tetap menerima koneksi meskipun reset_session gagal
+        connection.close()
+    except Exception as e:
+        if not discard:
+            logger.warning("Error returning connection to the pool: %s", e)
+
+
+def after_commit(func, *args, **kwargs):
+    """
+    Run `func(*args, **kwargs)` once the current `@transactional` view commits.
+
+    Dropped if the transaction is rolled back. Outside a transactional view
+    the call runs immediately.
+    """
+    callbacks = g.get('db_after_commit')
+    if callbacks is None:
+        func(*args, **kwargs)
+    else:
+        callbacks.append((func, args, kwargs))
+
+
+def _rollback():
+    """Roll back the request-scoped transaction, if one was started"""
+    connection = g.get('db')
+    if connection is not None and connection.in_transaction:
+        connection.rollback()
+
+
+def transactional(view):
+    """
+    Run a view in one transaction on the request-scoped connection.
+
+    No connection is taken until the view first calls `get_db`/`get_cursor`,
+    so validation errors and slow work done before that, like bcrypt, do not
+    hold one. Commits when the view returns a response below 400, rolls back
+    on an error response or an exception, then runs the `after_commit`
+    callbacks. A nested transactional view joins the outer transaction.
     """
-    connection = db_pool.get_connection()
-    connection.autocommit = True
-    return connection
\ No newline at end of file
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if g.get('db_transactional'):
+            return view(*args, **kwargs)
+        g.db_transactional = True
+        g.db_after_commit = []
+        try:
+            response = make_response(view(*args, **kwargs))
+        except BaseException:
+            _rollback()
+            g.pop('db_after_commit', None)
+            raise
+        finally:
+            g.pop('db_transactional', None)
+        callbacks = g.pop('db_after_commit', [])
+        if response.status_code >= 400:
+            _rollback()
+            return response
+        connection = g.get('db')
+        if connection is not None and connection.in_transaction:
+            connection.commit()
+        for func, callback_args, callback_kwargs in callbacks:
+            try:
+                func(*callback_args, **callback_kwargs)
+            except Exception as e:
+                logger.error("Error in after_commit callback %s: %s", func.__name__, e)
+        return response
+    return wrapper
@@ -0,0 +1,307 @@
+"""Idempotency-Key support for create endpoints"""
+import functools
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response, jsonify, make_response, request
+from flask_jwt_extended import get_jwt_identity
+
+from helper.admission import remaining_time
+from helper.db_helper import get_connection
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'Idempotency-Key'
+
+CREATE_TABLE_QUERY = """
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    idempotency_key VARCHAR(255) NOT NULL PRIMARY KEY,
+    fingerprint CHAR(64) NOT NULL,
+    status_code INT NULL,
+    body MEDIUMBLOB NULL,
+    mimetype VARCHAR(100) NULL,
+    claimed_at DATETIME NULL,
+    expires_at DATETIME NOT NULL,
+    KEY idx_idempotency_keys_expires_at (expires_at)
+)
+"""
+
+
+class IdempotencyStore:
+    """
+    Bounded, expiring cache of responses keyed by `Idempotency-Key`.
+
+    The first request with a given key runs the view; retries get the stored
+    response back without running it again. A retry that arrives while the
+    first request is still running waits for it instead of inserting a second
+    row. With `IDEMPOTENCY_PERSIST` enabled, keys are also claimed in the
+    `idempotency_keys` table so retries that land on another worker, or after
+    a restart, are deduplicated too. A claim that never gets a response,
+    because its worker died, can be taken over after `IDEMPOTENCY_LEASE`
+    seconds.
+    """
+
+    def __init__(self, app=None):
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._table_ready = False
+        self.ttl = 86400
+        self.max_entries = 10000
+        self.wait_timeout = 30
+        self.persist = False
+        self.lease = 60
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read config"""
+        self.ttl = app.config.get('IDEMPOTENCY_TTL', 86400)
+        self.max_entries = app.config.get('IDEMPOTENCY_MAX_ENTRIES', 10000)
+        self.wait_timeout = app.config.get('IDEMPOTENCY_WAIT_TIMEOUT', 30)
+        self.persist = app.config.get('IDEMPOTENCY_PERSIST', False)
+        self.lease = app.config.get('IDEMPOTENCY_LEASE', 60)
+        app.extensions['idempotency'] = self
+
+    def idempotent(self, view):
+        """Decorator for views that create rows, must come after `jwt_required`"""
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            client_key = request.headers.get(HEADER)
+            if not client_key:
+                return view(*args, **kwargs)
+            if len(client_key) > 128:
+                return jsonify({"message": f"{HEADER} is too long"}), 400
+
+            identity = get_jwt_identity() or {}
+            key = f"{identity.get('id_users')}:{request.endpoint}:{client_key}"
+            fingerprint = _fingerprint()
+
+            entry = self._claim(key, fingerprint)
+            if entry is not None:
+                return entry
+
+            try:
+                response = make_response(view(*args, **kwargs))
+            except BaseException:
+                self._release(key, None)
+                raise
+            # Server errors are not stored so the client can retry them
+            if response.status_code >= 500:
+                self._release(key, None)
+            else:
+                self._release(key, (fingerprint, response.status_code,
+                                    response.get_data(), response.mimetype))
+            return response
+        return wrapper
+
+    def _claim(self, key, fingerprint):
+        """
+        Wait until `key` is free, then either claim it or return its response.
+
+        Returns:
+            Response: The stored (or error) response, or None if this request
+            now owns the key and must run the view.
+        """
+        wait = self.wait_timeout
+        remaining = remaining_time()
+        if remaining is not None:
+            # Tetap di bawah deadline request supaya get_connection tidak gagal
+            wait = max(min(wait, remaining - 1), 0)
+        deadline = time.monotonic() + wait
+        while True:
+            with self._lock:
+                entry = self._get(key)
+                event = self._inflight.get(key)
+                if entry is None and event is None:
+                    self._inflight[key] = threading.Event()
+                    break
+            if entry is not None:
+                return _replay(entry, fingerprint)
+            if not event.wait(max(deadline - time.monotonic(), 0)):
+                return _in_progress()
+
+        if not self.persist:
+            return None
+        try:
+            entry = self._claim_persisted(key, fingerprint, deadline)
+        except Exception as e:
+            # The local cache still covers retries that hit this worker
+            logger.error("Error claiming idempotency key: %s", e)
+            return None
+        if entry is None:
+            return None
+        self._release(key, None if entry is _IN_PROGRESS else entry, persist=False)
+        if entry is _IN_PROGRESS:
+            return _in_progress()
+        return _replay(entry, fingerprint)
+
+    def _release(self, key, entry, persist=True):
+        """Store the outcome for `key` and wake up waiting duplicates"""
+        with self._lock:
+            if entry is not None:
+                self._entries[key] = (time.monotonic() + self.ttl,) + entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            event = self._inflight.pop(key, None)
+        if event is not None:
+            event.set()
+        if not (self.persist and persist):
+            return
+        if entry is not None:
+            self._save_persisted(key, entry)
+        else:
+            self._forget_persisted(key)
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1:]
+
+    def _ensure_table(self, cursor):
+        if not self._table_ready:
+            cursor.execute(CREATE_TABLE_QUERY)
+            # Tables created before the claim lease existed
+            cursor.execute("SHOW COLUMNS FROM idempotency_keys LIKE 'claimed_at'")
+            if cursor.fetchone() is None:
+                cursor.execute(
+                    "ALTER TABLE idempotency_keys ADD COLUMN claimed_at DATETIME NULL")
+            self._table_ready = True
+
+    def _claim_persisted(self, key, fingerprint, deadline):
+        """
+        Claim `key` in the table, or return the row another worker stored.
+
+        While another worker holds the claim, poll with backoff. The pooled
+        connection is returned between polls.
+        """
+        delay = 0.05
+        while True:
+            entry = self._try_claim_persisted(key, fingerprint)
+            if entry is not _IN_PROGRESS:
+                return entry
+            if time.monotonic() + delay >= deadline:
+                return _IN_PROGRESS
+            time.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+    def _try_claim_persisted(self, key, fingerprint):
+        """
+        One claim attempt.
+
+        Returns:
+            None if this worker now owns the key, the stored entry if the
+            request already finished, or `_IN_PROGRESS`.
+        """
+        connection = get_connection()
+        cursor = None
+        try:
+            cursor = connection.cursor()
+            self._ensure_table(cursor)
+            cursor.execute(
+                "DELETE FROM idempotency_keys WHERE idempotency_key = %s AND expires_at < NOW()",
+                (key,))
+            cursor.execute(
+                "INSERT IGNORE INTO idempotency_keys "
+                "(idempotency_key, fingerprint, claimed_at, expires_at) "
+                "VALUES (%s, %s, NOW(), NOW() + INTERVAL %s SECOND)",
+                (key, fingerprint, self.ttl))
+            claimed = cursor.rowcount == 1
+            if not claimed:
+                # Ambil alih klaim yang lease-nya habis, workernya kemungkinan mati
+                cursor.execute(
+                    "UPDATE idempotency_keys SET fingerprint = %s, claimed_at = NOW(), "
+                    "expires_at = NOW() + INTERVAL %s SECOND "
+                    "WHERE idempotency_key = %s AND status_code IS NULL "
+                    "AND (claimed_at IS NULL OR claimed_at < NOW() - INTERVAL %s SECOND)",
+                    (fingerprint, self.ttl, key, self.lease))
+                claimed = cursor.rowcount == 1
+            connection.commit()
+            if claimed:
+                return None
+            cursor.execute(
+                "SELECT fingerprint, status_code, body, mimetype "
+                "FROM idempotency_keys WHERE idempotency_key = %s",
+                (key,))
+            row = cursor.fetchone()
+            if row is None:
+                # Dilepas pemiliknya sejak INSERT di atas, coba lagi
+                return _IN_PROGRESS
+            if row[1] is not None:
+                return row[0], row[1], bytes(row[2]), row[3]
+            return _IN_PROGRESS
+        finally:
+            if cursor:
+                cursor.close()
+            connection.close()
+
+    def _save_persisted(self, key, entry):
+        self._execute_persisted(
+            "UPDATE idempotency_keys SET fingerprint = %s, status_code = %s, body = %s, "
+            "mimetype = %s WHERE idempotency_key = %s",
+            entry + (key,))
+
+    def _forget_persisted(self, key):
+        self._execute_persisted(
+            "DELETE FROM idempotency_keys WHERE idempotency_key = %s AND status_code IS NULL",
+            (key,))
+
+    def _execute_persisted(self, query, params):
+        connection = None
+        cursor = None
+        try:
+            connection = get_connection()
+            cursor = connection.cursor()
+            self._ensure_table(cursor)
+            cursor.execute(query, params)
+            connection.commit()
+        except Exception as e:
+            logger.error("Error persisting idempotency key: %s", e)
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                connection.close()
+
+
+_IN_PROGRESS = object()
+
+
+def _fingerprint():
+    """Hash of the request payload, to reject a key reused for another request"""
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(request.path.encode())
+    if request.form or request.files:
+        # Multipart boundaries change between retries, so hash the parsed fields
+        for name, value in sorted(request.form.items(multi=True)):
+            digest.update(f"{name}={value}&".encode())
+        for name, upload in sorted(request.files.items(multi=True)):
+            digest.update(f"{name}={upload.filename}&".encode())
+    else:
+        digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _replay(entry, fingerprint):
+    stored_fingerprint, status_code, body, mimetype = entry
+    if stored_fingerprint != fingerprint:
+        return jsonify({"message": f"{HEADER} was already used for a different request"}), 422
+    response = Response(body, status=status_code, mimetype=mimetype)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _in_progress():
+    response = jsonify({"message": "A request with this Idempotency-Key is still in progress"})
+    response.headers['Retry-After'] = '1'
+    return response, 409
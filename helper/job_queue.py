@@ -0,0 +1,189 @@
+"""In-process job queue for side effects that should not delay the response"""
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CREATE_SPOOL_QUERY = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending',
+    error TEXT,
+    owner INTEGER,
+    created_at REAL NOT NULL
+)
+"""
+
+
+class JobQueue:
+    """
+    Runs registered tasks on a pool of worker threads, with retries.
+
+    Handlers call `enqueue` after their commit and return right away. When
+    `JOB_QUEUE_SPOOL` points to a file, every job is also written to a SQLite
+    spool before it is queued and removed once it succeeds, so pending jobs
+    are picked up again after a restart. Worker processes may share one
+    spool file: each job records the pid that queued it, and a starting
+    worker only takes over the jobs of processes that are gone. Keep job
+    arguments JSON serializable.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._tasks = {}
+        self._queue = queue.Queue()
+        self._workers = []
+        self._spool = None
+        self._spool_lock = threading.Lock()
+        self.max_retries = 3
+        self.retry_delay = 1.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read config, open the spool and start the workers"""
+        self.app = app
+        self.max_retries = app.config.get('JOB_QUEUE_MAX_RETRIES', 3)
+        self.retry_delay = app.config.get('JOB_QUEUE_RETRY_DELAY', 1.0)
+        app.extensions['job_queue'] = self
+
+        spool_path = app.config.get('JOB_QUEUE_SPOOL')
+        if spool_path:
+            self._spool = sqlite3.connect(spool_path, check_same_thread=False)
+            self._spool.execute(CREATE_SPOOL_QUERY)
+            columns = [row[1] for row in self._spool.execute("PRAGMA table_info(jobs)")]
+            if "owner" not in columns:
+                # Spool dari versi sebelum kolom owner
+                self._spool.execute("ALTER TABLE jobs ADD COLUMN owner INTEGER")
+            self._spool.commit()
+            self._requeue_spooled()
+
+        for index in range(app.config.get('JOB_QUEUE_WORKERS', 2)):
+            worker = threading.Thread(
+                target=self._work, name=f"job-queue-{index}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def task(self, func):
+        """Register `func` as a task, enqueued with `job_queue.enqueue(func, ...)`"""
+        self._tasks[_task_name(func)] = func
+        return func
+
+    def enqueue(self, func, *args, **kwargs):
+        """
+        Queue a registered task to run in the background.
+
+        Args:
+            func (callable): A function decorated with `@job_queue.task`.
+            *args, **kwargs: Arguments for the task, JSON serializable.
+        """
+        name = _task_name(func)
+        if name not in self._tasks:
+            raise ValueError(f"Task {name} is not registered")
+        job = {"id": None, "task": name, "args": list(args), "kwargs": kwargs, "attempts": 0}
+        if self._spool is not None:
+            with self._spool_lock:
+                cursor = self._spool.execute(
+                    "INSERT INTO jobs (task, payload, owner, created_at) VALUES (?, ?, ?, ?)",
+                    (name, json.dumps({"args": job["args"], "kwargs": kwargs}), os.getpid(),
+                     time.time()))
+                self._spool.commit()
+            job["id"] = cursor.lastrowid
+        self._queue.put(job)
+
+    def pending(self):
+        """Approximate number of jobs waiting for a worker"""
+        return self._queue.qsize()
+
+    def _requeue_spooled(self):
+        """Take over the pending jobs of worker processes that are gone, and queue them"""
+        pid = os.getpid()
+        with self._spool_lock:
+            owners = [owner for (owner,) in self._spool.execute(
+                "SELECT DISTINCT owner FROM jobs WHERE status = 'pending'")]
+            for owner in owners:
+                # pid sendiri berarti proses sebelumnya, ini belum meng-enqueue apa pun
+                if owner is None or owner == pid or not _process_alive(owner):
+                    # Worker lain yang start bersamaan hanya mengubah 0 baris
+                    self._spool.execute(
+                        "UPDATE jobs SET owner = ? WHERE status = 'pending' AND owner IS ?",
+                        (pid, owner))
+            self._spool.commit()
+            rows = self._spool.execute(
+                "SELECT id, task, payload, attempts FROM jobs "
+                "WHERE status = 'pending' AND owner = ? ORDER BY id", (pid,)
+            ).fetchall()
+        for job_id, name, payload, attempts in rows:
+            payload = json.loads(payload)
+            self._queue.put({"id": job_id, "task": name, "args": payload["args"],
+                             "kwargs": payload["kwargs"], "attempts": attempts})
+        if rows:
+            logger.info("Requeued %s spooled jobs", len(rows))
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job):
+        func = self._tasks.get(job["task"])
+        try:
+            if func is None:
+                raise LookupError(f"Task {job['task']} is not registered")
+            with self.app.app_context():
+                func(*job["args"], **job["kwargs"])
+        except Exception as e:
+            job["attempts"] += 1
+            if job["attempts"] > self.max_retries:
+                logger.error("Job %s failed after %s attempts: %s",
+                             job["task"], job["attempts"], e)
+                self._update_spool(job, "failed", repr(e))
+                return
+            delay = self.retry_delay * 2 ** (job["attempts"] - 1)
+            logger.warning("Job %s failed, retrying in %.1fs: %s", job["task"], delay, e)
+            self._update_spool(job, "pending", repr(e))
+            retry = threading.Timer(delay, self._queue.put, (job,))
+            retry.daemon = True
+            retry.start()
+            return
+        if self._spool is not None and job["id"] is not None:
+            with self._spool_lock:
+                self._spool.execute("DELETE FROM jobs WHERE id = ?", (job["id"],))
+                self._spool.commit()
+
+    def _update_spool(self, job, status, error):
+        if self._spool is None or job["id"] is None:
+            return
+        with self._spool_lock:
+            self._spool.execute(
+                "UPDATE jobs SET attempts = ?, status = ?, error = ? WHERE id = ?",
+                (job["attempts"], status, error, job["id"]))
+            self._spool.commit()
+
+
+def _process_alive(pid):
+    """True if a process with `pid` exists on this host"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def _task_name(func):
+    return f"{func.__module__}.{func.__qualname__}"
@@ -0,0 +1,270 @@
+"""Opt-in sampling profiler for live workers"""
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from flask import Response, g, jsonify, request
+
+logger = logging.getLogger(__name__)
+
+MAX_STACK_DEPTH = 128
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _frame_label(code):
+    """`function (path:line)` label of one frame, paths relative to the project"""
+    filename = code.co_filename
+    if filename.startswith(PROJECT_ROOT):
+        filename = os.path.relpath(filename, PROJECT_ROOT)
+    else:
+        filename = "/".join(filename.split(os.sep)[-2:])
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def _folded_stack(frame):
+    """Stack of `frame` in folded format, outermost frame first"""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return ";".join(labels)
+
+
+def summarize(stacks, limit=30):
+    """
+    Top functions of a folded-stack profile.
+
+    Args:
+        stacks (Counter): Sample count per folded stack.
+        limit (int): Number of functions to return.
+
+    Returns:
+        dict: Sample total, and the top functions by self samples (the frame
+        was running) and by total samples (the frame was on the stack).
+    """
+    own = Counter()
+    total = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")
+        own[frames[-1]] += count
+        for label in set(frames):
+            total[label] += count
+    samples = sum(stacks.values())
+
+    def top(counter):
+        return [{"function": label, "samples": count,
+                 "percent": round(100.0 * count / samples, 2)}
+                for label, count in counter.most_common(limit)]
+
+    return {"samples": samples, "top_self": top(own), "top_total": top(total)}
+
+
+def _snapshot():
+    """tracemalloc snapshot without the profiler's own allocations"""
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+
+
+def folded(stacks):
+    """Folded-stack text, the input of flamegraph.pl and speedscope"""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+class StackSampler:
+    """
+    Samples the Python stacks of other threads with `sys._current_frames`.
+
+    Runs on its own daemon thread and only reads frames, so the sampled
+    threads are never paused. `select(ident)` returns the prefix for a thread
+    (for example its route) or None to skip it.
+    """
+
+    def __init__(self, interval, select):
+        self.interval = interval
+        self.select = select
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        """Start sampling"""
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop sampling and return the collected stacks"""
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():  # pylint: disable=protected-access
+                if ident == own_ident:
+                    continue
+                prefix = self.select(ident)
+                if prefix is not None:
+                    stack = _folded_stack(frame)
+                    self.stacks[f"{prefix};{stack}" if prefix else stack] += 1
+
+
+class Profiler:
+    """
+    Authenticated CPU and memory profiling, off unless `PROFILER_ENABLED`.
+
+    When disabled no hooks are registered and the profiler blueprint is not
+    mounted, so requests pay nothing. When enabled every profiling call must
+    carry `X-Profiler-Token` matching `PROFILER_TOKEN`, and the worker tracks
+    which route each request thread is serving so samples can be grouped
+    per route. A request with `?profile=1` (or `?profile=folded`) returns its
+    own profile instead of its normal body.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self._token = ""
+        self._routes = {}
+        self._cpu_lock = threading.Lock()
+        self._memory_lock = threading.Lock()
+        self._baseline = None
+        self.max_seconds = 30
+        self.interval = 0.01
+        self.request_interval = 0.001
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read config and, when enabled, register the request hooks"""
+        self._token = app.config.get('PROFILER_TOKEN', '')
+        self.max_seconds = app.config.get('PROFILER_MAX_SECONDS', 30)
+        self.interval = app.config.get('PROFILER_INTERVAL', 0.01)
+        self.enabled = bool(app.config.get('PROFILER_ENABLED')) and bool(self._token)
+        if app.config.get('PROFILER_ENABLED') and not self._token:
+            logger.warning("PROFILER_ENABLED is set without PROFILER_TOKEN, profiler stays off")
+        app.extensions['profiler'] = self
+        if not self.enabled:
+            return
+        app.before_request(self._track_request)
+        app.after_request(self._finish_request_profile)
+        app.teardown_request(self._untrack_request)
+
+    def authorized(self):
+        """True if the request carries the profiler token"""
+        supplied = request.headers.get('X-Profiler-Token', '')
+        return self.enabled and hmac.compare_digest(supplied.encode(), self._token.encode())
+
+    def _track_request(self):
+        ident = threading.get_ident()
+        self._routes[ident] = request.endpoint or "unknown"
+        if request.args.get('profile') in ('1', 'folded') and self.authorized():
+            g.profile_started = time.perf_counter()
+            g.profile_sampler = StackSampler(
+                self.request_interval,
+                lambda sampled: "" if sampled == ident else None).start()
+
+    def _finish_request_profile(self, response):
+        sampler = g.pop('profile_sampler', None)
+        if sampler is None:
+            return response
+        stacks = sampler.stop()
+        elapsed = time.perf_counter() - g.pop('profile_started')
+        if request.args.get('profile') == 'folded':
+            profile = Response(folded(stacks), mimetype='text/plain')
+        else:
+            profile = jsonify({
+                "message": "OK",
+                "route": request.endpoint,
+                "response_status": response.status_code,
+                "elapsed_ms": round(elapsed * 1000, 3),
+                "interval_ms": self.request_interval * 1000,
+                **summarize(stacks),
+                "folded": folded(stacks),
+            })
+        profile.headers['X-Profiled-Status'] = str(response.status_code)
+        return profile
+
+    def _untrack_request(self, _exc):
+        sampler = g.pop('profile_sampler', None)
+        if sampler is not None:
+            sampler.stop()
+        self._routes.pop(threading.get_ident(), None)
+
+    def sample_cpu(self, seconds, interval=None, route=None, all_threads=False):
+        """
+        Sample all request threads of this worker for `seconds`.
+
+        Stacks are prefixed with the route being served, so one profile
+        yields a flame graph per route. `route` keeps only that endpoint;
+        `all_threads` also samples background threads such as the scheduler
+        and job queue workers.
+
+        Returns:
+            Counter: Sample count per folded stack, or None if another CPU
+            profile is already running in this worker.
+        """
+        if not self._cpu_lock.acquire(blocking=False):
+            return None
+        try:
+            def select(ident):
+                current = self._routes.get(ident)
+                if current is None:
+                    return "background" if all_threads and not route else None
+                if route and current != route:
+                    return None
+                return current
+
+            sampler = StackSampler(interval or self.interval, select).start()
+            time.sleep(min(seconds, self.max_seconds))
+            return sampler.stop()
+        finally:
+            self._cpu_lock.release()
+
+    def start_memory(self, frames=10):
+        """Start tracemalloc if needed and take the baseline snapshot"""
+        with self._memory_lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            self._baseline = _snapshot()
+
+    def stop_memory(self):
+        """Stop tracemalloc and drop the baseline, freeing its memory"""
+        with self._memory_lock:
+            self._baseline = None
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+    def memory_report(self, limit=20, group_by='lineno'):
+        """
+        Top allocators of the current tracemalloc snapshot.
+
+        Returns:
+            dict: Traced memory totals, the top allocation sites, and their
+            growth since the baseline, or None when tracemalloc is not running.
+        """
+        with self._memory_lock:
+            if not tracemalloc.is_tracing():
+                return None
+            snapshot = _snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            report = {
+                "traced_bytes": current,
+                "peak_bytes": peak,
+                "top": [{"site": str(stat.traceback), "size_bytes": stat.size,
+                         "count": stat.count}
+                        for stat in snapshot.statistics(group_by)[:limit]],
+            }
+            if self._baseline is not None:
+                report["growth"] = [
+                    {"site": str(stat.traceback), "size_diff_bytes": stat.size_diff,
+                     "count_diff": stat.count_diff}
+                    for stat in snapshot.compare_to(self._baseline, group_by)[:limit]]
+            return report
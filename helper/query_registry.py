@@ -0,0 +1,34 @@
+"""Registry of the SQL run by the endpoints, checked with EXPLAIN by migrations.explain"""
+import dataclasses
+
+
+@dataclasses.dataclass(frozen=True)
+class RegisteredQuery:
+    """A named query with sample parameters to EXPLAIN it with"""
+    name: str
+    sql: str
+    sample_params: tuple = ()
+    allow_full_scan: tuple = ()
+
+
+QUERIES = {}
+
+
+def register_query(name, sql, sample_params=(), allow_full_scan=()):
+    """
+    Register a query and return its SQL unchanged.
+
+    Args:
+        name (str): Unique name, usually `<blueprint>.<route>`.
+        sql (str): The query, with `%s` placeholders.
+        sample_params (tuple): Parameters used when running EXPLAIN.
+        allow_full_scan (tuple): Tables (or aliases) that may be read with a
+            full table or full index scan, for queries that return the whole table on purpose.
+
+    Returns:
+        str: `sql`, so the call can be assigned to a module constant.
+    """
+    if name in QUERIES and QUERIES[name].sql != sql:
+        raise ValueError(f"Query {name} is already registered")
+    QUERIES[name] = RegisteredQuery(name, sql, tuple(sample_params), tuple(allow_full_scan))
+    return sql
@@ -0,0 +1,86 @@
+"""Compact columnar responses for list endpoints"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from flask import Response, jsonify, request
+
+try:
+    import msgpack
+except ImportError:  # optional dependency, only needed for MessagePack responses
+    msgpack = None
+
+COLUMNAR_MIMETYPE = 'application/vnd.rentfield.columnar+json'
+MSGPACK_MIMETYPE = 'application/x-msgpack'
+
+
+def requested_format():
+    """
+    Compact format asked for by the client, through `?format=` or `Accept`.
+
+    Returns:
+        str: `columnar`, `msgpack`, or None for the regular array of objects.
+    """
+    fmt = request.args.get('format')
+    if fmt in ('columnar', 'msgpack'):
+        return fmt
+    best = request.accept_mimetypes.best_match(
+        ['application/json', COLUMNAR_MIMETYPE, MSGPACK_MIMETYPE])
+    if best == MSGPACK_MIMETYPE:
+        return 'msgpack'
+    if best == COLUMNAR_MIMETYPE:
+        return 'columnar'
+    return None
+
+
+def _msgpack_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, timedelta)):
+        return str(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _column_converters(columns, rows, converters):
+    """Per-column converter, or None where the value can be sent as is"""
+    result = [converters.get(column) for column in columns]
+    if rows:
+        # JSON cannot encode timedelta (TIME columns), look at the first row only
+        for index, value in enumerate(rows[0]):
+            if result[index] is None and isinstance(value, timedelta):
+                result[index] = str
+    return result
+
+
+def columnar_response(fmt, columns, rows, converters=None, **envelope):
+    """
+    Build a columnar response straight from cursor tuples.
+
+    Args:
+        fmt (str): Value returned by `requested_format`.
+        columns (list): Column names, usually `cursor.column_names`.
+        rows (list): Tuples from a non-dictionary cursor.
+        converters (dict): Optional `{column: callable}` applied to each value.
+        **envelope: Extra top level keys, e.g. `message="OK"`.
+
+    Returns:
+        Response: `{"columns": [...], "rows": [[...], ...]}` as JSON or MessagePack.
+    """
+    columns = list(columns)
+    column_converters = _column_converters(columns, rows, converters or {})
+    if any(column_converters):
+        rows = [
+            [value if convert is None or value is None else convert(value)
+             for convert, value in zip(column_converters, row)]
+            for row in rows
+        ]
+    payload = dict(envelope, columns=columns, rows=rows)
+
+    if fmt == 'msgpack':
+        if msgpack is None:
+            return jsonify({"message": "MessagePack is not available on this server"}), 406
+        body = msgpack.packb(payload, default=_msgpack_default, use_bin_type=True)
+        return Response(body, mimetype=MSGPACK_MIMETYPE)
+
+    response = jsonify(payload)
+    response.mimetype = COLUMNAR_MIMETYPE
+    return response
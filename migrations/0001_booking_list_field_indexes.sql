@@ -0,0 +1,15 @@
+-- Composite indexes for the hot booking and list_field access paths.
+
+-- booking/read: WHERE booking.id_users = ? (rows come back in date order)
+CREATE INDEX idx_booking_users_date ON booking (id_users, booking_date, start_time);
+
+-- booking/read_by_owner and the calendar: join on id_field, range on the date.
+-- end_time is included so occupancy lookups are answered from the index alone.
+CREATE INDEX idx_booking_field_date ON booking (id_field, booking_date, start_time, end_time);
+
+-- Status scheduler: WHERE status IN (...) AND booking_date <= ?
+CREATE INDEX idx_booking_status_date ON booking (status, booking_date, start_time, end_time);
+
+-- list_field/read for owners and the owner join in booking/read_by_owner.
+-- Covers id_field so the join to booking does not touch the clustered index.
+CREATE INDEX idx_list_field_users ON list_field (id_users, id_field);
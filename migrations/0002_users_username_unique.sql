@@ -0,0 +1,5 @@
+-- auth/login and auth/reset-password look users up by username.
+-- Remove duplicate usernames before applying, otherwise this migration fails.
+-- Once applied, auth/register answers 409 "Username already exists" for a
+-- taken username instead of inserting a second row.
+ALTER TABLE users ADD CONSTRAINT uq_users_username UNIQUE (username);
@@ -0,0 +1,36 @@
+-- Soft delete for booking and list_field, and the archive for old bookings.
+
+-- booking/delete and list_field/delete now set deleted_at instead of removing the row.
+ALTER TABLE booking ADD COLUMN deleted_at DATETIME NULL DEFAULT NULL;
+ALTER TABLE list_field ADD COLUMN deleted_at DATETIME NULL DEFAULT NULL;
+
+-- Keep the calendar and owner lookups index-only now that they filter deleted_at.
+-- Dropped and re-added in one ALTER: the old index may be the one backing the
+-- foreign key on id_field / id_users, which a standalone DROP INDEX refuses.
+ALTER TABLE booking
+    DROP INDEX idx_booking_field_date,
+    ADD INDEX idx_booking_field_date (id_field, booking_date, start_time, end_time, deleted_at);
+ALTER TABLE list_field
+    DROP INDEX idx_list_field_users,
+    ADD INDEX idx_list_field_users (id_users, deleted_at, id_field);
+
+-- Completed bookings older than BOOKING_ARCHIVE_AFTER_MONTHS are moved here by
+-- helper.booking_archive. Same columns as booking plus archived_at, so rows are
+-- copied with INSERT ... SELECT b.*. Foreign keys are not copied by LIKE, and
+-- partitioned tables cannot have them anyway.
+CREATE TABLE booking_archive LIKE booking;
+ALTER TABLE booking_archive ADD COLUMN archived_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP;
+
+-- Every unique key of a partitioned table must contain the partition column.
+ALTER TABLE booking_archive MODIFY id_booking INT NOT NULL, DROP PRIMARY KEY,
+    ADD PRIMARY KEY (id_booking, booking_date);
+
+-- One partition per year; old years can be dropped or exported whole.
+-- Split pmax with REORGANIZE PARTITION before it starts filling up.
+ALTER TABLE booking_archive PARTITION BY RANGE (YEAR(booking_date)) (
+    PARTITION p2023 VALUES LESS THAN (2024),
+    PARTITION p2024 VALUES LESS THAN (2025),
+    PARTITION p2025 VALUES LESS THAN (2026),
+    PARTITION p2026 VALUES LESS THAN (2027),
+    PARTITION pmax VALUES LESS THAN MAXVALUE
+);
@@ -0,0 +1,81 @@
+"""
+Run EXPLAIN on every registered query and fail on unexpected full scans.
+
+Usage:
+    python -m migrations.explain
+    python -m migrations.explain --verbose
+
+Queries are registered with `helper.query_registry.register_query` where
+they are defined. MySQL happily scans tiny tables even when an index
+exists, so run this against a realistically sized database, for example one
+loaded with `python -m benchmarks.seed`.
+"""
+import argparse
+import importlib
+import sys
+
+from helper.db_helper import get_connection
+from helper.query_registry import QUERIES
+
+# EXPLAIN access types that read every row: a table scan, or a full index scan
+FULL_SCAN_TYPES = ("ALL", "index")
+
+# Modules that register queries at import time
+QUERY_MODULES = [
+    "api.auth.endpoints",
+    "api.booking.endpoint",
+    "api.list_field.endpoints",
+    "helper.booking_archive",
+    "helper.booking_scheduler",
+]
+
+
+def explain(cursor, query):
+    """
+    EXPLAIN one registered query.
+
+    Returns:
+        tuple: The EXPLAIN rows and the tables read with a full table or full
+        index scan that the query does not allow.
+    """
+    cursor.execute("EXPLAIN " + query.sql, query.sample_params)
+    rows = cursor.fetchall()
+    full_scans = [row["table"] for row in rows
+                  if row.get("type") in FULL_SCAN_TYPES and row.get("table") not in query.allow_full_scan]
+    return rows, full_scans
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--verbose", action="store_true", help="Print every EXPLAIN row")
+    args = parser.parse_args()
+
+    for module in QUERY_MODULES:
+        importlib.import_module(module)
+
+    failures = 0
+    connection = get_connection()
+    cursor = connection.cursor(dictionary=True)
+    try:
+        for name in sorted(QUERIES):
+            rows, full_scans = explain(cursor, QUERIES[name])
+            status = "FULL SCAN " + ", ".join(full_scans) if full_scans else "ok"
+            print(f"{name:<40}{status}")
+            if args.verbose:
+                for row in rows:
+                    print(f"    {row.get('table')}: type={row.get('type')} "
+                          f"key={row.get('key')} rows={row.get('rows')} extra={row.get('Extra')}")
+            if full_scans:
+                failures += 1
+    finally:
+        cursor.close()
+        connection.close()
+
+    if failures:
+        print(f"{failures} of {len(QUERIES)} queries fall back to a full scan")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Apply the versioned SQL migrations in this directory.
+
+Usage:
+    python -m migrations.migrate            # apply pending migrations
+    python -m migrations.migrate --status   # list applied and pending ones
+
+Migrations are `NNNN_description.sql` files applied in version order. Each
+applied version is recorded in `schema_migrations`, so running the command
+again only applies new files.
+"""
+import argparse
+import os
+import re
+
+from helper.db_helper import get_connection
+
+MIGRATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+FILENAME_PATTERN = re.compile(r"^(\d{4})_[\w-]+\.sql$")
+
+CREATE_TABLE_QUERY = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version VARCHAR(255) NOT NULL PRIMARY KEY,
+    applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+def available_migrations():
+    """List of (version, path) sorted by version"""
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        if FILENAME_PATTERN.match(filename):
+            migrations.append((filename[:-len(".sql")], os.path.join(MIGRATIONS_DIR, filename)))
+    return migrations
+
+
+def split_statements(sql):
+    """Split a migration file into statements, dropping `--` comment lines"""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [statement.strip() for statement in "\n".join(lines).split(";")
+            if statement.strip()]
+
+
+def applied_versions(cursor):
+    """Versions already recorded in schema_migrations"""
+    cursor.execute(CREATE_TABLE_QUERY)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def migrate():
+    """
+    Apply every pending migration.
+
+    Returns:
+        list: Versions applied.
+    """
+    connection = get_connection()
+    cursor = None
+    try:
+        cursor = connection.cursor()
+        done = applied_versions(cursor)
+        applied = []
+        for version, path in available_migrations():
+            if version in done:
+                continue
+            with open(path, encoding="utf-8") as migration_file:
+                statements = split_statements(migration_file.read())
+            # MySQL commits DDL implicitly, so a version is recorded only after
+            # all of its statements succeeded
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (version,))
+            connection.commit()
+            applied.append(version)
+            print(f"Applied {version}")
+        return applied
+    finally:
+        if cursor:
+            cursor.close()
+        connection.close()
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--status", action="store_true",
+                        help="Show applied and pending migrations without applying them")
+    args = parser.parse_args()
+
+    if args.status:
+        connection = get_connection()
+        cursor = connection.cursor()
+        try:
+            done = applied_versions(cursor)
+        finally:
+            cursor.close()
+            connection.close()
+        for version, _ in available_migrations():
+            print(f"{'applied' if version in done else 'pending'}  {version}")
+        return
+
+    if not migrate():
+        print("Nothing to apply")
+
+
+if __name__ == '__main__':
+    main()
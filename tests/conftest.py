@@ -0,0 +1,9 @@
+"""Shared test setup"""
+from unittest import mock
+
+from mysql.connector.pooling import MySQLConnectionPool
+
+# helper.db_helper fills its pool on import; the unit tests never reach MySQL,
+# so build the pool without opening connections
+with mock.patch.object(MySQLConnectionPool, "add_connection"):
+    import helper.db_helper  # noqa: F401  pylint: disable=unused-import
@@ -0,0 +1,42 @@
+from unittest import mock
+
+import pytest
+from flask import Flask
+from mysql.connector import errorcode
+from mysql.connector.errors import IntegrityError
+
+from api.auth import endpoints as auth
+from helper import db_helper
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.testing = True
+    db_helper.init_app(app)
+    app.register_blueprint(auth.auth_endpoints, url_prefix='/auth')
+    return app.test_client()
+
+
+def register(client, insert_error):
+    connection = mock.Mock(in_transaction=False)
+    connection.cursor.return_value.execute.side_effect = insert_error
+    with mock.patch.object(db_helper, "get_connection", return_value=connection), \
+            mock.patch.object(auth.bcrypt, "generate_password_hash", return_value=b"hash"):
+        response = client.post('/auth/register', data={
+            "username": "taken", "password": "secret", "role": "User"})
+    return response, connection
+
+
+def test_register_duplicate_username_returns_409(client):
+    response, connection = register(client, IntegrityError(
+        msg="Duplicate entry 'taken' for key 'uq_users_username'", errno=errorcode.ER_DUP_ENTRY))
+    assert response.status_code == 409
+    assert response.get_json()["description"] == "Username already exists"
+    connection.commit.assert_not_called()
+
+
+def test_register_other_integrity_errors_still_raise(client):
+    with pytest.raises(IntegrityError):
+        register(client, IntegrityError(msg="Column 'role' cannot be null",
+                                        errno=errorcode.ER_BAD_NULL_ERROR))
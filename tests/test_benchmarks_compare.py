@@ -0,0 +1,25 @@
+from benchmarks.compare import compare
+
+
+def result(rps, p95, shed_pct=None):
+    entry = {"name": "auth/login", "throughput_rps": rps, "peak_rss_mb": 50,
+             "latency_ms": {"p50": p95 / 2, "p95": p95, "p99": p95}}
+    if shed_pct is not None:
+        entry["shed_pct"] = shed_pct
+    return {"results": [entry]}
+
+
+def test_more_shedding_is_a_regression_even_if_faster():
+    rows, regressed = compare(result(100, 20, 0), result(300, 5, 60), 10)
+    assert regressed
+    assert ("auth/login", "shed %", 0, 60, None) in rows
+
+
+def test_results_without_shed_pct_count_as_zero():
+    _rows, regressed = compare(result(100, 20), result(100, 20, 5), 10)
+    assert not regressed
+
+
+def test_slower_p95_is_a_regression():
+    _rows, regressed = compare(result(100, 20, 0), result(100, 30, 0), 10)
+    assert regressed
@@ -0,0 +1,18 @@
+from datetime import date
+
+import pytest
+
+from helper.booking_archive import months_ago
+
+
+@pytest.mark.parametrize("today, months, expected", [
+    (date(2024, 7, 15), 6, date(2024, 1, 15)),
+    (date(2024, 3, 15), 6, date(2023, 9, 15)),
+    (date(2024, 8, 31), 6, date(2024, 2, 29)),
+    (date(2023, 8, 31), 6, date(2023, 2, 28)),
+    (date(2024, 12, 31), 1, date(2024, 11, 30)),
+    (date(2024, 1, 10), 0, date(2024, 1, 10)),
+    (date(2024, 1, 10), 24, date(2022, 1, 10)),
+])
+def test_months_ago(today, months, expected):
+    assert months_ago(today, months) == expected
@@ -0,0 +1,101 @@
+from datetime import date
+from unittest import mock
+
+import pytest
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+
+from api.booking.endpoint import booking_endpoints
+from extensions import booking_scheduler, cache
+from helper import db_helper
+
+
+class FakeConnection:
+    """Just enough of a pooled connection for one request"""
+
+    def __init__(self, rows):
+        self.in_transaction = False
+        self.cursor_ = mock.Mock(lastrowid=10)
+        self.cursor_.fetchone.side_effect = rows
+        self.committed = False
+
+    def start_transaction(self):
+        self.in_transaction = True
+
+    def commit(self):
+        self.in_transaction = False
+        self.committed = True
+
+    def rollback(self):
+        self.in_transaction = False
+
+    def cursor(self, **_kwargs):
+        return self.cursor_
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.config.update(JWT_SECRET_KEY="test-secret-with-enough-length-for-hs256",
+                      JWT_VERIFY_SUB=False)
+    JWTManager(app)
+    db_helper.init_app(app)
+    app.register_blueprint(booking_endpoints, url_prefix='/booking')
+    with app.app_context():
+        token = create_access_token(identity={"id_users": 1, "username": "user"})
+    client = app.test_client()
+    client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+    return client
+
+
+def test_create_accepts_unpadded_date(client):
+    cache.invalidate_tags("field:5")
+    connection = FakeConnection([{"price": 100, "id_owner": 2}])
+    with mock.patch.object(db_helper, "get_connection", return_value=connection), \
+            mock.patch.object(booking_scheduler, "schedule") as schedule, \
+            mock.patch.object(cache, "invalidate_tags") as invalidate:
+        response = client.post('/booking/create', data={
+            "id_field": "5", "booking_date": "2030-1-5",
+            "start_time": "08:00:00", "end_time": "10:00:00"})
+
+    assert response.status_code == 201, response.get_json()
+    assert connection.committed
+    insert_params = connection.cursor_.execute.call_args_list[-1][0][1]
+    assert insert_params[2] == date(2030, 1, 5)
+    assert schedule.call_args[0][0].date() == date(2030, 1, 5)
+    invalidate.assert_called_once_with("calendar:5:2029-12-31")
+
+
+@pytest.mark.parametrize("booking_date", ["2030-02-30", "05/01/2030", "soon"])
+def test_create_rejects_invalid_date_before_touching_the_database(client, booking_date):
+    with mock.patch.object(db_helper, "get_connection") as get_connection:
+        response = client.post('/booking/create', data={
+            "id_field": "5", "booking_date": booking_date,
+            "start_time": "08:00:00", "end_time": "10:00:00"})
+    assert response.status_code == 400
+    get_connection.assert_not_called()
+
+
+def test_update_normalizes_date(client):
+    existing = {"id_booking": 3, "id_field": 5, "booking_date": date(2030, 1, 1)}
+    connection = FakeConnection([existing])
+    with mock.patch.object(db_helper, "get_connection", return_value=connection), \
+            mock.patch.object(booking_scheduler, "schedule"), \
+            mock.patch.object(cache, "invalidate_tags") as invalidate:
+        response = client.put('/booking/update/3', json={
+            "booking_date": "2030-1-9", "start_time": "08:00:00", "end_time": "09:00:00",
+            "status": "UPCOMING", "total_price": 100})
+
+    assert response.status_code == 200, response.get_json()
+    assert [c[0][0] for c in invalidate.call_args_list] == [
+        "calendar:5:2029-12-31", "calendar:5:2030-01-07"]
+
+
+def test_update_rejects_invalid_date(client):
+    with mock.patch.object(db_helper, "get_connection") as get_connection:
+        response = client.put('/booking/update/3', json={"booking_date": "2030-13-01"})
+    assert response.status_code == 400
+    get_connection.assert_not_called()
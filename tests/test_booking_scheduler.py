@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+from unittest import mock
+
+import pytest
+
+from helper import booking_scheduler as scheduler_module
+from helper.booking_scheduler import BookingStatusScheduler, compute_status
+
+
+@pytest.mark.parametrize("now, status", [
+    (datetime(2024, 1, 1, 7, 59), "UPCOMING"),
+    (datetime(2024, 1, 1, 8, 0), "ONGOING"),
+    (datetime(2024, 1, 1, 8, 59), "ONGOING"),
+    (datetime(2024, 1, 1, 9, 0), "COMPLETED"),
+])
+def test_compute_status(now, status):
+    assert compute_status("2024-01-01", "08:00:00", "09:00:00", now) == status
+
+
+class FakeLockServer:
+    """MySQL named locks shared by the fake connections"""
+
+    def __init__(self):
+        self.holder = None
+        self.next_id = 1
+        self.updates = []
+
+    def connect(self):
+        connection = mock.Mock()
+        connection.id = self.next_id
+        self.next_id += 1
+
+        def execute(query, params=()):
+            if query.startswith("SELECT GET_LOCK"):
+                if self.holder in (None, connection.id):
+                    self.holder = connection.id
+                    connection.cursor.return_value.fetchone.return_value = (1,)
+                else:
+                    connection.cursor.return_value.fetchone.return_value = (0,)
+            elif query.startswith("SELECT IS_USED_LOCK"):
+                connection.cursor.return_value.fetchone.return_value = (
+                    int(self.holder == connection.id),)
+            elif "UPDATE booking" in query:
+                self.updates.append(connection.id)
+
+        def close():
+            if self.holder == connection.id:
+                self.holder = None
+
+        connection.cursor.return_value.execute.side_effect = execute
+        connection.cursor.return_value.fetchall.return_value = []
+        connection.close.side_effect = close
+        return connection
+
+
+def test_only_the_lock_holder_ticks():
+    server = FakeLockServer()
+    first, second = BookingStatusScheduler(), BookingStatusScheduler()
+    with mock.patch.object(scheduler_module, "get_dedicated_connection", server.connect):
+        assert first._hold_lock()  # pylint: disable=protected-access
+        assert not second._hold_lock()  # pylint: disable=protected-access
+        assert first.tick() is not None
+        assert second.tick() is None
+        # Holding the lock is checked, not taken again
+        assert first._hold_lock()  # pylint: disable=protected-access
+        assert server.next_id == 3
+
+        first._release_lock()  # pylint: disable=protected-access
+        assert second._hold_lock()  # pylint: disable=protected-access
+        assert second.tick() is not None
+    assert set(server.updates) == {1, 3}
+
+
+def test_schedule_is_ignored_without_the_lock():
+    scheduler = BookingStatusScheduler()
+    scheduler.schedule(datetime.now())
+    assert scheduler._heap == []  # pylint: disable=protected-access
+
+
+def test_failed_tick_is_retried():
+    scheduler = BookingStatusScheduler()
+    scheduler.poll_interval = 3600
+    scheduler.retry_delay = 0.05
+    scheduler._lock_connection = mock.Mock()  # pylint: disable=protected-access
+    ticks = []
+
+    def tick(now=None):
+        ticks.append(now)
+        if len(ticks) == 1:
+            return None
+        scheduler.stop()
+        return 0, 0
+
+    with mock.patch.object(scheduler, "_refresh"), mock.patch.object(scheduler, "tick", tick), \
+            mock.patch.object(scheduler, "_hold_lock", return_value=True):
+        scheduler.schedule(datetime.now() - timedelta(seconds=1))
+        scheduler.start()
+        scheduler._thread.join(5)  # pylint: disable=protected-access
+
+    assert len(ticks) == 2
+    assert ticks[1] - ticks[0] >= timedelta(seconds=0.05)
+    assert scheduler._lock_connection is None  # pylint: disable=protected-access
@@ -0,0 +1,211 @@
+import threading
+
+import pytest
+from flask import Flask, jsonify
+
+from helper.cache import Cache
+
+
+def make_cache(**config):
+    app = Flask(__name__)
+    app.config.update(CACHE_TTL=60, CACHE_TTLS='', **config)
+    return Cache(app)
+
+
+def test_get_set_delete():
+    cache = make_cache()
+    assert cache.get("field:1", "default") == "default"
+    cache.set("field:1", {"price": 10})
+    assert cache.get("field:1") == {"price": 10}
+    cache.delete("field:1")
+    assert cache.get("field:1") is None
+
+
+def test_none_is_not_cached():
+    cache = make_cache()
+    cache.set("field:1", None)
+    assert cache.get("field:1", "missing") == "missing"
+
+
+def test_lru_eviction():
+    cache = make_cache(CACHE_SIZE=2)
+    cache.set("a:1", 1)
+    cache.set("a:2", 2)
+    cache.get("a:1")
+    cache.set("a:3", 3)
+    assert cache.get("a:2") is None
+    assert cache.get("a:1") == 1
+    assert cache.stats()["namespaces"]["a"]["evictions"] == 1
+
+
+def test_get_or_set_coalesces_concurrent_misses():
+    cache = make_cache()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(cache.get_or_set("k:1", loader)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(cache.get_or_set("k:1", loader)))
+                 for _ in range(4)]
+    for follower in followers:
+        follower.start()
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert calls == [1]
+    assert results == ["value"] * 5
+
+
+def test_get_or_set_shares_the_error():
+    cache = make_cache()
+    started = threading.Event()
+    release = threading.Event()
+
+    def loader():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("database down")
+
+    errors = []
+
+    def call():
+        try:
+            cache.get_or_set("k:1", loader)
+        except RuntimeError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=call)
+    follower.start()
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert len(errors) == 2 and errors[0] is errors[1]
+    assert cache.get("k:1") is None
+
+
+def test_invalidate_tags():
+    cache = make_cache()
+    cache.set("field_price:1", 10, tags=("field:1",))
+    cache.set("field_price:2", 20, tags=("field:2",))
+    cache.set("list_field_read:x", "body", tags=("field:1", "list_field"))
+    cache.invalidate_tags("field:1")
+    assert cache.get("field_price:1") is None
+    assert cache.get("list_field_read:x") is None
+    assert cache.get("field_price:2") == 20
+
+
+def test_set_skips_value_read_before_an_invalidation():
+    cache = make_cache()
+    versions = cache.tag_versions(("field:1",))
+    cache.invalidate_tags("field:1")
+    cache.set("field_price:1", "stale", tags=("field:1",), versions=versions)
+    assert cache.get("field_price:1") is None
+
+    versions = cache.tag_versions(("field:1",))
+    cache.set("field_price:1", "fresh", tags=("field:1",), versions=versions)
+    assert cache.get("field_price:1") == "fresh"
+
+
+def test_get_or_set_does_not_store_load_raced_by_invalidation():
+    cache = make_cache()
+
+    def loader():
+        cache.invalidate_tags("field:1")
+        return "stale"
+
+    assert cache.get_or_set("field_price:1", loader, tags=("field:1",)) == "stale"
+    assert cache.get("field_price:1") is None
+
+
+def test_tag_versions_survive_counter_reset():
+    cache = make_cache(CACHE_SIZE=1)
+    versions = cache.tag_versions(("field:1",))
+    cache.invalidate_tags("field:1")
+    # Enough distinct tags to clear the counters and start a new epoch
+    cache.invalidate_tags(*[f"field:{i}" for i in range(2, 8)])
+    cache.invalidate_tags("field:9")
+    cache.set("field_price:1", "stale", tags=("field:1",), versions=versions)
+    assert cache.get("field_price:1") is None
+
+
+def test_shared_tier_between_workers(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    first = make_cache(CACHE_SHARED_PATH=path, CACHE_SYNC_INTERVAL=0)
+    second = make_cache(CACHE_SHARED_PATH=path, CACHE_SYNC_INTERVAL=0)
+
+    first.set("field_price:1", 10, tags=("field:1",))
+    assert second.get("field_price:1") == 10
+
+    second.invalidate_tags("field:1")
+    assert first.get("field_price:1") is None
+
+
+def test_memoize_renders_key_and_tags():
+    cache = make_cache()
+    calls = []
+
+    @cache.memoize("field_price:{id_field}", tags=("field:{id_field}",))
+    def load(id_field):
+        calls.append(id_field)
+        return id_field * 10
+
+    assert load(1) == 10
+    assert load(id_field=1) == 10
+    assert load(2) == 20
+    assert calls == [1, 2]
+    cache.invalidate_tags("field:1")
+    assert load(1) == 10
+    assert calls == [1, 2, 1]
+
+
+@pytest.fixture
+def view_app():
+    app = Flask(__name__)
+    cache = Cache()
+    cache.init_app(app)
+    calls = []
+
+    @app.route('/fields/<int:id_users>')
+    @cache.cached_view(lambda id_users: f"list_field_read:{id_users}",
+                       tags=lambda id_users: (f"user:{id_users}",))
+    def fields(id_users):
+        calls.append(id_users)
+        if id_users == 0:
+            return jsonify({"message": "Not found"}), 404
+        return jsonify({"id_users": id_users, "calls": len(calls)})
+
+    return app, cache, calls
+
+
+def test_cached_view_caches_200_per_query_string(view_app):
+    app, cache, calls = view_app
+    client = app.test_client()
+    assert client.get('/fields/1').get_json() == {"id_users": 1, "calls": 1}
+    assert client.get('/fields/1').get_json() == {"id_users": 1, "calls": 1}
+    assert client.get('/fields/1?format=columnar').get_json()["calls"] == 2
+
+    cache.invalidate_tags("user:1")
+    assert client.get('/fields/1').get_json()["calls"] == 3
+    assert calls == [1, 1, 1]
+
+
+def test_cached_view_does_not_cache_errors(view_app):
+    app, _cache, calls = view_app
+    client = app.test_client()
+    assert client.get('/fields/0').status_code == 404
+    assert client.get('/fields/0').status_code == 404
+    assert calls == [0, 0]
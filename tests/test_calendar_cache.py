@@ -0,0 +1,47 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from helper.calendar_cache import build_grid, calendar_key, parse_slot, to_minutes
+
+
+@pytest.mark.parametrize("value, minutes", [("30m", 30), ("1h", 60), ("5m", 5), ("24h", 1440)])
+def test_parse_slot(value, minutes):
+    assert parse_slot(value) == minutes
+
+
+@pytest.mark.parametrize("value", [None, "", "30", "1d", "4m", "7m", "0h", "h1"])
+def test_parse_slot_rejects(value):
+    with pytest.raises(ValueError):
+        parse_slot(value)
+
+
+def test_to_minutes():
+    assert to_minutes(timedelta(hours=9, minutes=30)) == 570
+    assert to_minutes("09:30:00") == 570
+
+
+def test_build_grid_marks_overlapping_slots():
+    monday = date(2024, 1, 1)
+    grid = build_grid([(monday, 60, 150)], monday, monday + timedelta(days=1), 60)
+    assert list(grid) == ["2024-01-01", "2024-01-02"]
+    # 01:00-02:30 covers the 01:00 and 02:00 slots
+    assert grid["2024-01-01"] == "011" + "0" * 21
+    assert grid["2024-01-02"] == "0" * 24
+
+
+def test_build_grid_skips_empty_and_out_of_range_intervals():
+    monday = date(2024, 1, 1)
+    intervals = [(monday, 120, 120), (monday, 180, 60), (date(2024, 1, 9), 0, 60)]
+    assert build_grid(intervals, monday, monday, 30) == {"2024-01-01": "0" * 48}
+
+
+def test_build_grid_clamps_to_end_of_day():
+    monday = date(2024, 1, 1)
+    grid = build_grid([(monday, 23 * 60, 24 * 60)], monday, monday, 60)
+    assert grid["2024-01-01"] == "0" * 23 + "1"
+
+
+@pytest.mark.parametrize("booking_date", ["2024-01-03", date(2024, 1, 7), datetime(2024, 1, 1, 8)])
+def test_calendar_key_uses_monday(booking_date):
+    assert calendar_key(12, booking_date) == "calendar:12:2024-01-01"
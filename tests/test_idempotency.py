@@ -0,0 +1,94 @@
+import threading
+
+import pytest
+from flask import Flask, jsonify, request
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required
+
+from helper.idempotency import IdempotencyStore
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update(JWT_SECRET_KEY="test-secret-with-enough-length-for-hs256",
+                      JWT_VERIFY_SUB=False, IDEMPOTENCY_WAIT_TIMEOUT=5)
+    JWTManager(app)
+    store = IdempotencyStore(app)
+    app.calls = []
+    app.started = threading.Event()
+    app.release = threading.Event()
+    app.release.set()
+
+    @app.route('/create', methods=['POST'])
+    @jwt_required()
+    @store.idempotent
+    def create():
+        app.calls.append(request.get_json())
+        app.started.set()
+        app.release.wait(5)
+        if request.get_json().get("fail"):
+            return jsonify({"message": "Error"}), 500
+        return jsonify({"id": len(app.calls)}), 201
+
+    with app.app_context():
+        app.token = create_access_token(identity={"id_users": 1, "username": "user"})
+    return app
+
+
+def post(app, key, payload):
+    return app.test_client().post('/create', json=payload, headers={
+        "Authorization": f"Bearer {app.token}", "Idempotency-Key": key})
+
+
+def test_retry_replays_stored_response(app):
+    first = post(app, "abc", {"name": "a"})
+    second = post(app, "abc", {"name": "a"})
+    assert first.status_code == second.status_code == 201
+    assert second.get_json() == first.get_json() == {"id": 1}
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert len(app.calls) == 1
+
+
+def test_key_reused_for_other_payload(app):
+    post(app, "abc", {"name": "a"})
+    assert post(app, "abc", {"name": "b"}).status_code == 422
+    assert len(app.calls) == 1
+
+
+def test_server_errors_are_not_stored(app):
+    assert post(app, "abc", {"fail": True}).status_code == 500
+    assert post(app, "abc", {"fail": True}).status_code == 500
+    assert len(app.calls) == 2
+
+
+def test_concurrent_retry_waits_for_first_request(app):
+    app.release.clear()
+    responses = {}
+    first = threading.Thread(target=lambda: responses.update(first=post(app, "abc", {"name": "a"})))
+    first.start()
+    assert app.started.wait(5)
+    retry = threading.Thread(target=lambda: responses.update(retry=post(app, "abc", {"name": "a"})))
+    retry.start()
+    app.release.set()
+    first.join(5)
+    retry.join(5)
+
+    assert len(app.calls) == 1
+    assert responses["retry"].status_code == 201
+    assert responses["retry"].get_json() == responses["first"].get_json()
+
+
+def test_concurrent_retry_gives_up_with_409(app):
+    store = app.extensions['idempotency']
+    store.wait_timeout = 0.1
+    app.release.clear()
+    first = threading.Thread(target=post, args=(app, "abc", {"name": "a"}))
+    first.start()
+    assert app.started.wait(5)
+    response = post(app, "abc", {"name": "a"})
+    app.release.set()
+    first.join(5)
+
+    assert response.status_code == 409
+    assert response.headers["Retry-After"] == "1"
+    assert len(app.calls) == 1
@@ -0,0 +1,116 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from helper.job_queue import JobQueue
+
+
+def make_queue(**config):
+    app = Flask(__name__)
+    app.config.update({"JOB_QUEUE_WORKERS": 1, "JOB_QUEUE_MAX_RETRIES": 3,
+                       "JOB_QUEUE_RETRY_DELAY": 0.05, **config})
+    return JobQueue(app)
+
+
+def test_retries_with_backoff():
+    queue = make_queue()
+    attempts = []
+    done = threading.Event()
+
+    @queue.task
+    def flaky(value):
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            raise RuntimeError("try again")
+        done.set()
+        assert value == "payload"
+
+    queue.enqueue(flaky, "payload")
+    assert done.wait(5)
+    assert len(attempts) == 3
+    first_delay = attempts[1] - attempts[0]
+    second_delay = attempts[2] - attempts[1]
+    assert first_delay >= 0.05
+    assert second_delay >= 0.1
+
+
+def test_gives_up_after_max_retries():
+    queue = make_queue(JOB_QUEUE_MAX_RETRIES=1, JOB_QUEUE_RETRY_DELAY=0.01)
+    attempts = []
+
+    @queue.task
+    def broken():
+        attempts.append(1)
+        raise RuntimeError("always")
+
+    queue.enqueue(broken)
+    time.sleep(0.3)
+    assert attempts == [1, 1]
+
+
+def test_enqueue_requires_registered_task():
+    queue = make_queue()
+    with pytest.raises(ValueError):
+        queue.enqueue(print, "not a task")
+
+
+def test_spooled_jobs_run_after_restart(tmp_path):
+    spool = str(tmp_path / "jobs.sqlite")
+    stopped = make_queue(JOB_QUEUE_SPOOL=spool, JOB_QUEUE_WORKERS=0)
+    ran = threading.Event()
+
+    def record(value):
+        assert value == 42
+        ran.set()
+
+    stopped.task(record)
+    stopped.enqueue(record, 42)
+
+    restarted = JobQueue()
+    restarted.task(record)
+    app = Flask(__name__)
+    app.config.update(JOB_QUEUE_SPOOL=spool, JOB_QUEUE_WORKERS=1)
+    restarted.init_app(app)
+    assert ran.wait(5)
+
+
+def test_restart_only_takes_over_jobs_of_dead_workers(tmp_path):
+    spool = str(tmp_path / "jobs.sqlite")
+    make_queue(JOB_QUEUE_SPOOL=spool, JOB_QUEUE_WORKERS=0)
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    live_owner = os.getppid()
+    connection = sqlite3.connect(spool)
+    for value, owner in ((1, dead.pid), (2, live_owner), (3, None)):
+        connection.execute(
+            "INSERT INTO jobs (task, payload, owner, created_at) VALUES (?, ?, ?, 0)",
+            (f"{__name__}.record", json.dumps({"args": [value], "kwargs": {}}), owner))
+    connection.commit()
+
+    ran = []
+    done = threading.Event()
+
+    def record(value):
+        ran.append(value)
+        if len(ran) == 2:
+            done.set()
+
+    record.__qualname__ = "record"
+    restarted = JobQueue()
+    restarted.task(record)
+    app = Flask(__name__)
+    app.config.update(JOB_QUEUE_SPOOL=spool, JOB_QUEUE_WORKERS=1)
+    restarted.init_app(app)
+
+    assert done.wait(5)
+    time.sleep(0.1)
+    assert sorted(ran) == [1, 3]
+    (owner,) = connection.execute("SELECT owner FROM jobs WHERE payload LIKE '%[2]%'").fetchone()
+    assert owner == live_owner
@@ -0,0 +1,48 @@
+import io
+from unittest import mock
+
+import pytest
+from flask import Flask, g
+
+from api.list_field.endpoints import _parse_field_row
+from helper.bulk_io import iter_rows
+from helper.db_helper import release_db
+
+
+def test_parse_field_row_defaults():
+    assert _parse_field_row({"field_name": " Court ", "address": "Main St"}, 7) == (
+        "Court", "Main St", "", "Unknown", 0, 0.0, "", 7)
+
+
+@pytest.mark.parametrize("row", [
+    {"field_name": 123, "address": "x"},
+    {"field_name": "Court", "address": ["x"]},
+    {"field_name": "Court", "address": "x", "description": {"a": 1}},
+    {"field_name": "Court", "address": "x", "capacity": "many"},
+    {"field_name": "", "address": "x"},
+])
+def test_parse_field_row_rejects_with_value_error(row):
+    with pytest.raises(ValueError):
+        _parse_field_row(row, 7)
+
+
+def test_ndjson_rows_keep_json_types():
+    stream = io.BytesIO(b'{"field_name": 123, "address": "x"}\n[1]\n')
+    rows = list(iter_rows(stream, "ndjson"))
+    assert rows[0] == (1, {"field_name": 123, "address": "x"})
+    assert isinstance(rows[1][1], ValueError)
+
+
+def test_release_db_discards_connection_with_unread_rows():
+    connection = mock.Mock()
+    cursor = mock.Mock()
+    cursor.close.side_effect = RuntimeError("Unread result found")
+    connection.close.side_effect = RuntimeError("reset_session failed")
+    with Flask(__name__).app_context():
+        g.db = connection
+        g.db_cursors = [cursor]
+        release_db(discard=True)
+        assert 'db' not in g
+    connection.disconnect.assert_called_once_with()
+    connection.rollback.assert_not_called()
+    connection.close.assert_called_once_with()